@@ -0,0 +1,240 @@
+"""Offline benchmarks against local stub upstreams.
+
+    python -m bench.run check --requests 2000 --concurrency 50
+    python -m bench.run scanner --tokens 500 --rate-limit-rate 0.02
+
+Run from the repository root. Nothing here touches the network: DexScreener
+and rugcheck are replaced by bench.stubs.StubServer on 127.0.0.1.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import aiohttp
+import yaml
+
+from bench.stubs import StubBehavior, StubServer, fake_address
+from services.ratelimit import HostScheduler, TokenBucket
+from services.trade_dispatch import percentile
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'max_ms': (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+def print_report(name: str, report: Dict[str, Any]):
+    latency = report['latency']
+    print(f"{name}: {report['operations']} operations in {report['seconds']:.2f}s "
+          f"({report['throughput']:.1f}/s), concurrency {report['concurrency']}")
+    print(f"  latency ms: p50 {latency['p50_ms']:.1f}  p95 {latency['p95_ms']:.1f}  "
+          f"p99 {latency['p99_ms']:.1f}  max {latency['max_ms']:.1f}")
+    for key in ('outcomes', 'stub', 'extra'):
+        if report.get(key):
+            print(f"  {key}: " + ", ".join(f"{k}={v}" for k, v in report[key].items()))
+
+def stub_scheduler(stub: StubServer, args) -> HostScheduler:
+    # The stub stands in for both upstreams, so it gets one combined budget
+    return HostScheduler(limits={stub.host: (args.upstream_rate, args.upstream_burst)})
+
+async def bench_check(args, behavior: StubBehavior) -> Dict[str, Any]:
+    """/check handler logic: validate, read-through lookup, blacklist flags, formatting"""
+    from bot.commands import format_check_response
+    from db.blacklist import BlacklistStore
+    from db.database import Database
+    from services.dexscreener import DexScreenerService
+    from services.pairs import address_key
+    from services.token_lookup import TokenLookupService
+
+    stub = StubServer(behavior)
+    await stub.start()
+    dex_service = DexScreenerService(scheduler=stub_scheduler(stub, args))
+    dex_service.BASE_URL = dex_service.RUGCHECK_URL = stub.url
+    await dex_service.start()
+    rng = random.Random(behavior.seed)
+    addresses = [fake_address(f"token:{i}") for i in range(args.unique)]
+    # Well-formed addresses upstream has never heard of, and malformed input
+    junk = [fake_address(f"junk:{i}") for i in range(max(1, args.unique // 10))]
+    stub.missing.update(junk)
+    typos = [address[:-1] + "0" for address in addresses[:max(1, args.unique // 10)]]
+    workload = []
+    for _ in range(args.requests):
+        roll = rng.random()
+        if roll < args.invalid_rate:
+            workload.append(rng.choice(typos))
+        elif roll < args.invalid_rate + args.missing_rate:
+            workload.append(rng.choice(junk))
+        else:
+            workload.append(rng.choice(addresses))
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, "bench.db"))
+        blacklist = BlacklistStore(os.path.join(tmp, "blacklist.db"))
+        token_lookup = TokenLookupService(dex_service, database)
+
+        async def check(address: str):
+            async with semaphore:
+                started = time.perf_counter()
+                if not DexScreenerService.is_valid_pair_id(address):
+                    outcomes['invalid'] += 1
+                    return
+                address = address_key(address)
+                result = await token_lookup.lookup(address)
+                if result.record:
+                    format_check_response(result, blacklist.flags(address, result.record.get('creator')))
+                latencies.append(time.perf_counter() - started)
+                outcomes[result.origin if result.record else 'no_record'] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(check(address) for address in workload))
+        seconds = time.perf_counter() - started
+
+        await token_lookup.close()
+        await dex_service.close()
+        await database.close()
+        blacklist.close()
+    await stub.close()
+    return {
+        'operations': len(workload),
+        'seconds': seconds,
+        'throughput': len(workload) / seconds,
+        'concurrency': args.concurrency,
+        'latency': latency_summary(latencies),
+        'outcomes': dict(outcomes),
+        'stub': stub.stats(),
+        # Share of calls for an address already looked up earlier in the run
+        'extra': {'repeat_ratio': round(1 - len(set(workload)) / len(workload), 3), 'negative_hits': dex_service.negative_hits},
+    }
+
+def scanner_tokens(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Raw token list with a realistic mix of movers, quiet tokens and fake volume"""
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(count):
+        tokens.append({
+            'id': fake_address(f"scan:{i}"),
+            'name': f"Token {i}",
+            'price': round(rng.uniform(0.0001, 5), 6),
+            'price_change_percentage_24h': rng.choice([rng.uniform(20, 400), rng.uniform(-90, 19)]),
+            'daily_volume': rng.uniform(50, 5_000_000),
+            'volume_change_percentage_24h': rng.uniform(0, 800),
+            'developer_address': fake_address(f"dev:{i % (count // 3 + 1)}"),
+            'is_bundled': rng.random() < 0.05,
+        })
+    return tokens
+
+def scanner_config(stub: StubServer, args) -> Dict[str, Any]:
+    return {
+        'telegram': {'bot_token': "0:bench", 'chat_id': 1, 'digest_window': 0.5},
+        'bonkbot': {'telegram_chat_id': 2, 'trade_commands': {'buy_command': "/buy {token_id} {amount}", 'sell_command': "/sell {token_id} {amount}"}},
+        'rugcheck': {'api_key': "bench", 'base_url': f"{stub.url}/rugcheck", 'good_status': "Good"},
+        'supply_check': {'bundled_supply_field': "is_bundled"},
+        'fake_volume_detection': {'method': "algorithm", 'algorithm': {'min_volume_threshold': 1000, 'max_volume_change_percentage': 500}},
+        'filters': {'min_price_change_percentage_24h': 20, 'max_price_change_percentage_24h': -50, 'monitored_events': ["pumped", "rugged"]},
+        'pipeline': {'max_concurrency': args.concurrency},
+        'trading': {'latency_report_every': 10 ** 9},
+        'coin_blacklist': [],
+        'dev_blacklist': [],
+    }
+
+async def bench_scanner(args, behavior: StubBehavior) -> Dict[str, Any]:
+    """One scanner job: fetch the token list, filter, validate, dispatch trades, save"""
+    stub = StubServer(behavior, scanner_tokens=scanner_tokens(args.tokens, behavior.seed))
+    await stub.start()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The scanner reads config.yaml and creates its databases in the working directory
+        with open(os.path.join(tmp, "config.yaml"), "w") as f:
+            yaml.safe_dump(scanner_config(stub, args), f)
+        os.chdir(tmp)
+        try:
+            scanner = importlib.import_module("services.test")
+            scanner.setup("config.yaml")
+            scanner.DEXSCREENER_API_URL = f"{stub.url}/scanner/tokens"
+            sent = Counter()
+
+            async def telegram_sink(chat_id, message):
+                sent[chat_id] += 1
+
+            # Measure the pipeline, not Telegram's flood limits
+            scanner.notifier.send = telegram_sink
+            scanner.notifier.per_chat_rate = scanner.notifier.per_chat_burst = 10 ** 6
+            scanner.notifier.global_bucket = TokenBucket(10 ** 6, 10 ** 6)
+            scanner.trade_dispatcher.start()
+
+            async with aiohttp.ClientSession() as session:
+                started = time.perf_counter()
+                await scanner.run_job(session, stub_scheduler(stub, args))
+                await scanner.trade_dispatcher.close()
+                seconds = time.perf_counter() - started
+            await scanner.notifier.close()
+            scanner.engine.dispose()
+            scanner.blacklist.close()
+        finally:
+            os.chdir(cwd)
+    await stub.close()
+    trades = scanner.trade_dispatcher.latency.percentiles((50, 95, 99))
+    total = trades['total']
+    return {
+        'operations': args.tokens,
+        'seconds': seconds,
+        'throughput': args.tokens / seconds,
+        'concurrency': args.concurrency,
+        # Detection-to-order latency of every coin that made it to a trade
+        'latency': {
+            'count': scanner.trade_dispatcher.latency.count,
+            'p50_ms': total['p50'] * 1000,
+            'p95_ms': total['p95'] * 1000,
+            'p99_ms': total['p99'] * 1000,
+            'max_ms': max(scanner.trade_dispatcher.latency._samples['total'], default=0.0) * 1000,
+        },
+        'outcomes': {'trades': scanner.trade_dispatcher.latency.count, 'telegram_messages': sum(sent.values())},
+        'stub': stub.stats(),
+        'extra': {"validation_p99_ms": round(trades['validation']['p99'] * 1000, 1)},
+    }
+
+SCENARIOS = {'check': bench_check, 'scanner': bench_scanner}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PonderBot against local stub upstreams")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000, help="check: number of /check calls")
+    parser.add_argument("--unique", type=int, default=300, help="check: distinct token addresses")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="check: share of lookups for tokens upstream does not know")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="check: share of lookups for malformed addresses")
+    parser.add_argument("--tokens", type=int, default=500, help="scanner: tokens in the scanned list")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    parser.add_argument("--upstream-rate", type=float, default=500.0, help="client-side requests/s budget for the stub host")
+    parser.add_argument("--upstream-burst", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    behavior = StubBehavior(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.retry_after, args.seed)
+    report = asyncio.run(SCENARIOS[args.scenario](args, behavior))
+    print_report(args.scenario, report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(report, scenario=args.scenario, args=vars(args)), f, indent=2)
+
+if __name__ == "__main__":
+    main()
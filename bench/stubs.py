@@ -0,0 +1,182 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from aiohttp import web
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), "payloads")
+
+@dataclass
+class StubBehavior:
+    """How the stub misbehaves: latency in seconds, fault rates as fractions of requests"""
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 0.2
+    seed: int = 1
+
+def fake_address(seed: str) -> str:
+    """Deterministic Solana-style address: base58 of a 32-byte digest"""
+    alphabet = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+    digest = hashlib.sha256(seed.encode()).digest()
+    value = int.from_bytes(digest, "big")
+    chars = []
+    while value:
+        value, remainder = divmod(value, 58)
+        chars.append(alphabet[remainder])
+    zeros = len(digest) - len(digest.lstrip(b"\0"))
+    return "1" * zeros + "".join(reversed(chars))
+
+class PayloadStore:
+    """Recorded upstream payloads.
+
+    <dir>/pairs/<address>.json and <dir>/rugcheck/<address>.json are replayed
+    as-is when present; every other address gets the pair.json / rugcheck.json
+    template with its address filled in.
+    """
+
+    def __init__(self, directory: str = PAYLOAD_DIR):
+        self.directory = directory
+        self.pair_template = self._load("pair.json")
+        self.rugcheck_template = self._load("rugcheck.json")
+        self.profile_template = self._load("profile.json")
+
+    def _load(self, *parts: str) -> Optional[Any]:
+        path = os.path.join(self.directory, *parts)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def pair(self, address: str) -> Dict[str, Any]:
+        recorded = self._load("pairs", f"{address}.json")
+        if recorded is not None:
+            return recorded
+        pair = copy.deepcopy(self.pair_template)
+        pair_address = fake_address(f"pair:{address}")
+        pair['baseToken']['address'] = address
+        pair['pairAddress'] = pair_address
+        pair['url'] = f"https://dexscreener.com/{pair['chainId']}/{pair_address}"
+        return pair
+
+    def rugcheck(self, address: str) -> Dict[str, Any]:
+        recorded = self._load("rugcheck", f"{address}.json")
+        if recorded is not None:
+            return recorded
+        return copy.deepcopy(self.rugcheck_template)
+
+    def report(self, address: str) -> Dict[str, Any]:
+        # Full report: the summary fields plus the deployer
+        report = self.rugcheck(address)
+        report['creator'] = fake_address(f"creator:{address}")
+        return report
+
+    def profile(self, address: str) -> Dict[str, Any]:
+        profile = copy.deepcopy(self.profile_template)
+        profile['tokenAddress'] = address
+        profile['url'] = f"https://dexscreener.com/{profile['chainId']}/{address}"
+        return profile
+
+class StubServer:
+    """Local stand-in for the DexScreener and rugcheck APIs.
+
+    Serves the same paths DexScreenerService uses, plus the scanner's token
+    list (/scanner/tokens) and its rugcheck status check (/rugcheck/{id}).
+    Every response is delayed by latency +/- jitter; a fraction of requests
+    fail with 500 or 429 (with Retry-After) according to StubBehavior.
+    """
+
+    def __init__(
+        self,
+        behavior: Optional[StubBehavior] = None,
+        payloads: Optional[PayloadStore] = None,
+        scanner_tokens: Optional[List[Dict[str, Any]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.behavior = behavior or StubBehavior()
+        self.payloads = payloads or PayloadStore()
+        self.scanner_tokens = scanner_tokens or []
+        self.profiles: List[Dict[str, Any]] = []
+        # Addresses upstream does not know: no pairs, rugcheck 404
+        self.missing: Set[str] = set()
+        self.host = host
+        self.port = port
+        self._random = random.Random(self.behavior.seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application(middlewares=[self._faults])
+        app.router.add_get("/latest/dex/tokens/{addresses}", self._pairs)
+        app.router.add_get("/v1/tokens/{address}/report/summary", self._rugcheck)
+        app.router.add_get("/v1/tokens/{address}/report", self._report)
+        app.router.add_get("/token-profiles/latest/v1", self._profiles)
+        app.router.add_get("/scanner/tokens", self._scanner_tokens)
+        app.router.add_get("/rugcheck/{token_id}", self._scanner_rugcheck)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 means "pick a free one"; read back what the OS chose
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def stats(self) -> Dict[str, int]:
+        return {'requests': self.requests, 'errors': self.errors, 'rate_limited': self.rate_limited}
+
+    @web.middleware
+    async def _faults(self, request: web.Request, handler):
+        self.requests += 1
+        behavior = self.behavior
+        delay = behavior.latency + self._random.uniform(-behavior.jitter, behavior.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < behavior.rate_limit_rate:
+            self.rate_limited += 1
+            return web.json_response({'error': 'rate limited'}, status=429, headers={'Retry-After': f"{behavior.retry_after:g}"})
+        if roll < behavior.rate_limit_rate + behavior.error_rate:
+            self.errors += 1
+            return web.json_response({'error': 'internal error'}, status=500)
+        return await handler(request)
+
+    async def _pairs(self, request: web.Request) -> web.Response:
+        addresses = request.match_info['addresses'].split(',')
+        pairs = [self.payloads.pair(address) for address in addresses if address not in self.missing]
+        return web.json_response({'schemaVersion': '1.0.0', 'pairs': pairs or None})
+
+    async def _rugcheck(self, request: web.Request) -> web.Response:
+        address = request.match_info['address']
+        if address in self.missing:
+            return web.json_response({'error': 'not found'}, status=404)
+        return web.json_response(self.payloads.rugcheck(address))
+
+    async def _report(self, request: web.Request) -> web.Response:
+        address = request.match_info['address']
+        if address in self.missing:
+            return web.json_response({'error': 'not found'}, status=404)
+        return web.json_response(self.payloads.report(address))
+
+    async def _profiles(self, request: web.Request) -> web.Response:
+        return web.json_response(self.profiles)
+
+    async def _scanner_tokens(self, request: web.Request) -> web.Response:
+        return web.json_response({'tokens': self.scanner_tokens})
+
+    async def _scanner_rugcheck(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'Good'})
@@ -1,17 +1,237 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
 import discord
 from discord import app_commands
-# from services.dexscreener import DexScreenerService
+from typing import Dict, List, Optional
+from services.dexscreener import DexScreenerService
+from services.ratelimit import HostScheduler
+from services.token_lookup import TokenLookupService
+from db.blacklist import BlacklistStore
+from db.database import Database
+from db.subscriptions import SubscriptionStore
+from db.timeseries import TimeSeriesStore
+from services.alerts import AlertEngine
+from services.scanner import ScannerService
+from db.query_log import QueryLogWriter
+from services.metrics import COMMAND_LATENCY, REGISTRY, MetricsServer
 
-class PonderBot(discord.Client):
-    def __init__(self):
+logger = logging.getLogger(__name__)
+
+# Seconds between pulls of blacklist entries written by the scanner
+BLACKLIST_REFRESH_INTERVAL = 30.0
+
+# Seconds between time-series retention passes (primary worker only)
+TIMESERIES_PURGE_INTERVAL = 3600.0
+
+# Last synced command-schema hash per sync target (global or a guild id)
+COMMAND_HASH_FILE = ".command_schema.json"
+
+# Stand-in for process start when the launcher does not pass one
+_IMPORTED_AT = time.monotonic()
+
+def command_schema_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Stable hash of the exact payload tree.sync() would upload"""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get('type', 1), command['name']),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def load_command_hashes(path: str = COMMAND_HASH_FILE) -> Dict[str, str]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_command_hashes(hashes: Dict[str, str], path: str = COMMAND_HASH_FILE):
+    # Write-then-rename so a crash never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+class PonderTree(app_commands.CommandTree):
+    """Command tree that times every slash command into COMMAND_LATENCY"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs right before the command callback; completion is recorded by the client
+        interaction.extras['started_at'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        record_command_latency(interaction, "error")
+        await super().on_error(interaction, error)
+
+def record_command_latency(interaction: discord.Interaction, outcome: str):
+    started_at = interaction.extras.pop('started_at', None)
+    if started_at is not None and interaction.command is not None:
+        COMMAND_LATENCY.observe(time.perf_counter() - started_at, interaction.command.qualified_name, outcome)
+
+class PonderBot(discord.AutoShardedClient):
+    """Discord client; with no shard arguments it runs every shard Discord recommends.
+
+    In sharded deployments each worker process passes its shard_ids and the
+    total shard_count. Only the primary worker syncs the command tree and
+    purges the shared blacklist; everything else is per process.
+    """
+
+    def __init__(
+        self,
+        dev_guild_id: Optional[int] = None,
+        started_at: Optional[float] = None,
+        shard_ids: Optional[List[int]] = None,
+        shard_count: Optional[int] = None,
+        primary: bool = True,
+        metrics_port: Optional[int] = None,
+        alert_interval: float = 30.0,
+        scanner_config: Optional[str] = None,
+        workers: int = 1,
+    ):
         intents = discord.Intents.default()
-        super().__init__(intents=intents)
-        self.tree = app_commands.CommandTree(self)
-        # self.dex_service = DexScreenerService()
+        super().__init__(intents=intents, shard_ids=shard_ids, shard_count=shard_count)
+        self.tree = PonderTree(self)
+        self.primary = primary
+        # Dev mode: commands are synced to this guild only (instant, no global rate limit)
+        self.dev_guild = discord.Object(id=dev_guild_id) if dev_guild_id else None
+        # time.monotonic() at process start, for the startup-to-ready metric
+        self.started_at = started_at if started_at is not None else _IMPORTED_AT
+        self.startup_seconds: Optional[float] = None
+        # Shared HTTP client for DexScreener/rugcheck, opened in setup_hook. The upstream
+        # budgets are per IP, so each of the `workers` shard processes gets an equal share
+        self.dex_service = DexScreenerService(scheduler=HostScheduler(processes=workers))
+        self.database = Database()
+        # Market snapshots per token with 1m/1h/1d rollups, for /history
+        self.timeseries = TimeSeriesStore(self.database)
+        # Read-through lookups: tokens table first, DexScreener/rugcheck second
+        self.token_lookup = TokenLookupService(self.dex_service, self.database, timeseries=self.timeseries)
+        # Buffered analytics logging for user_queries, flushed in batches
+        self.query_log = QueryLogWriter(self.database)
+        # Blacklist shared with the scanner; lookups are in-memory set checks
+        self.blacklist = BlacklistStore()
+        self._blacklist_task = None
+        self._purge_task = None
+        # /watch and /alert subscriptions; only the primary worker polls them
+        self.subscriptions = SubscriptionStore(self.database)
+        self.alerts = AlertEngine(self.dex_service, self.subscriptions, self._send_alert, interval=alert_interval)
+        # Token scanner on this loop, sharing dex_service and blacklist; primary worker only
+        self.scanner = ScannerService(self.dex_service, self.blacklist, config_path=scanner_config)
+        # Prometheus text on http://127.0.0.1:<metrics_port>/metrics when a port is given
+        self.metrics_server = MetricsServer(port=metrics_port) if metrics_port else None
+        self._register_gauges()
+
+    def _register_gauges(self):
+        REGISTRY.gauge("ponderbot_cache_hit_ratio", "Hit ratio per in-memory cache",
+                       lambda: {(name,): stats['hit_ratio'] for name, stats in self.dex_service.cache_stats().items()}, ("cache",))
+        REGISTRY.gauge("ponderbot_cache_entries", "Entries per in-memory cache",
+                       lambda: {(name,): stats['size'] for name, stats in self.dex_service.cache_stats().items()}, ("cache",))
+        REGISTRY.gauge("ponderbot_db_pending_writes", "Writes queued for the database writer thread",
+                       lambda: self.database.pending_writes)
+        REGISTRY.gauge("ponderbot_query_log_buffered", "user_queries rows waiting to be flushed",
+                       lambda: self.query_log.pending)
+        REGISTRY.gauge("ponderbot_upstream_queue_depth", "Requests waiting for an upstream rate-limit token",
+                       lambda: self.dex_service.scheduler.queue_depth())
+        REGISTRY.gauge("ponderbot_subscriptions", "Watch and alert rules evaluated per poll",
+                       lambda: len(self.alerts.rules))
+        REGISTRY.gauge("ponderbot_startup_seconds", "Process start to first gateway ready",
+                       lambda: self.startup_seconds if self.startup_seconds is not None else {})
     
     async def setup_hook(self):
-        await self.tree.sync()
+        await self.dex_service.start()
+        self.query_log.start()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+        self._blacklist_task = asyncio.create_task(self._refresh_blacklist())
+        if self.primary:
+            self._purge_task = asyncio.create_task(self._purge_timeseries())
+            self.alerts.start()
+            self.scanner.start()
+            await self.sync_commands()
+
+    async def sync_commands(self, force: bool = False) -> bool:
+        """Sync the command tree only if its schema changed since the last sync.
+
+        Returns True when a sync was sent to Discord.
+        """
+        if self.dev_guild is not None:
+            self.tree.copy_global_to(guild=self.dev_guild)
+            target = f"guild:{self.dev_guild.id}"
+        else:
+            target = "global"
+        schema_hash = command_schema_hash(self.tree, self.dev_guild)
+        hashes = load_command_hashes()
+        if not force and hashes.get(target) == schema_hash:
+            logger.info("Command tree unchanged (%s), skipping sync", target)
+            return False
+        await self.tree.sync(guild=self.dev_guild)
+        hashes[target] = schema_hash
+        save_command_hashes(hashes)
+        logger.info("Synced command tree (%s)", target)
+        return True
+
+    async def close(self):
+        if self._blacklist_task is not None:
+            self._blacklist_task.cancel()
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.alerts.close()
+        await self.scanner.close()
+        await self.token_lookup.close()
+        await self.dex_service.close()
+        await self.query_log.close()
+        await self.database.close()
+        self.blacklist.close()
+        await super().close()
+
+    async def _refresh_blacklist(self):
+        # Pick up entries the scanner added and drop expired ones
+        while True:
+            await asyncio.sleep(BLACKLIST_REFRESH_INTERVAL)
+            try:
+                await asyncio.to_thread(self.blacklist.refresh)
+                # Expired rows are shared; one worker deleting them is enough
+                if self.primary:
+                    await asyncio.to_thread(self.blacklist.purge_expired)
+            except Exception as e:
+                logger.error("blacklist refresh failed: %r", e)
+
+    async def _send_alert(self, channel_id: int, text: str):
+        # REST-only send, so it works for channels on any shard
+        await self.get_partial_messageable(channel_id).send(
+            text, allowed_mentions=discord.AllowedMentions(users=True, everyone=False, roles=False)
+        )
+
+    async def _purge_timeseries(self):
+        # Drop samples and rollups past their retention
+        while True:
+            try:
+                removed = await self.timeseries.purge()
+                if removed:
+                    logger.info("Purged %d expired time-series rows", removed)
+            except Exception as e:
+                logger.error("time-series purge failed: %r", e)
+            await asyncio.sleep(TIMESERIES_PURGE_INTERVAL)
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        # Record slash command usage without touching the command's own latency
+        if interaction.type is not discord.InteractionType.application_command:
+            return
+        data = interaction.data or {}
+        options = " ".join(f"{opt.get('name')}={opt.get('value')}" for opt in data.get('options', []))
+        self.query_log.log_nowait(str(interaction.user.id), interaction.user.name, data.get('name', ''), options)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        record_command_latency(interaction, "ok")
 
     async def on_ready(self):
-        print(f'Logged in as {self.user}')
-        print('------')
\ No newline at end of file
+        # on_ready fires again after reconnects; only the first one measures startup
+        if self.startup_seconds is None:
+            self.startup_seconds = time.monotonic() - self.started_at
+            logger.info("Ready %.2fs after process start (shards %s of %s)", self.startup_seconds, sorted(self.shards), self.shard_count)
+        logger.info("Logged in as %s", self.user)
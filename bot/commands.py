@@ -1,7 +1,173 @@
+import asyncio
+import logging
+import re
+import time
 import discord
+from discord import app_commands
+from typing import Any, Dict, List, Optional
 from bot.client import PonderBot
 from services.dexscreener import DexScreenerService
-from db.database import Database
+from services.pairs import address_key
+from services.token_lookup import ORIGIN_FALLBACK, ORIGIN_STALE, SOURCE_OK, TokenLookupResult
+from db.subscriptions import KIND_ALERT, KIND_WATCH, METRIC_MARKET_CAP, METRIC_PRICE, OP_ABOVE, OP_BELOW, OP_MOVE, Subscription
+from db.timeseries import pick_resolution
+from services.metrics import COMMAND_LATENCY, UPSTREAM_LATENCY, UPSTREAM_RESPONSES
+
+logger = logging.getLogger(__name__)
+
+def format_check_response(result: TokenLookupResult, warnings: Optional[List[str]] = None) -> str:
+    """Build the /check reply, marking sources that were slow, failed or served from cache"""
+    record = result.record
+    rugcheck_status = result.statuses.get('rugcheck', SOURCE_OK)
+    if record.get('rugcheck_score') is not None:
+        rugcheck_line = f"Rugcheck score: {record['rugcheck_score']}"
+        if rugcheck_status != SOURCE_OK:
+            rugcheck_line += f" (last known, rugcheck {rugcheck_status})"
+    elif rugcheck_status == SOURCE_OK:
+        rugcheck_line = "Rugcheck score: N/A (no report)"
+    else:
+        rugcheck_line = f"Rugcheck score: N/A (rugcheck {rugcheck_status})"
+    response = (
+        f"URL: {record.get('url') or 'N/A'}\n"
+        f"DEX ID: {record.get('dexId') or 'N/A'}\n"
+        f"Market Cap: ${record.get('marketCap') or 0:,.2f}\n"
+        f"Quote Token: {record.get('quoteToken') or 'N/A'}\n"
+        f"{rugcheck_line}"
+    )
+    for warning in warnings or []:
+        response += f"\n**Warning: {warning}**"
+    if result.origin == ORIGIN_STALE:
+        response += f"\n_Cached {int(record['age_seconds'])}s ago, refreshing in the background_"
+    elif result.origin == ORIGIN_FALLBACK:
+        response += f"\n_DexScreener {result.statuses['pair']}, showing data from {int(record['age_seconds'])}s ago_"
+    return response
+
+# Upper bound on addresses per /checkmany so the reply fits one message
+MAX_CHECKMANY = 15
+
+def format_checkmany_line(address: str, result: TokenLookupResult, warnings: Optional[List[str]] = None) -> str:
+    """One compact line per token for the /checkmany reply"""
+    short = f"{address[:6]}...{address[-4:]}"
+    if not result.record:
+        pair_status = result.statuses.get('pair', SOURCE_OK)
+        return f"`{short}` no pair found" if pair_status == SOURCE_OK else f"`{short}` DexScreener {pair_status}"
+    record = result.record
+    score = record.get('rugcheck_score')
+    line = (
+        f"`{short}` {record.get('dexId') or 'N/A'} | "
+        f"MC ${record.get('marketCap') or 0:,.0f} | "
+        f"Rugcheck {score if score is not None else 'N/A'}"
+    )
+    if warnings:
+        line += " | **BLACKLISTED**"
+    if result.origin in (ORIGIN_STALE, ORIGIN_FALLBACK):
+        line += f" _(as of {int(record['age_seconds'])}s ago)_"
+    return line
+
+# /history ranges in seconds
+HISTORY_RANGES = {'1h': 3600, '6h': 6 * 3600, '24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400, '1y': 365 * 86400}
+RESOLUTION_NAMES = {60: "1m", 3600: "1h", 86400: "1d"}
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values: List[float], width: int = 30) -> str:
+    """Unicode block sparkline, resampled to at most `width` characters"""
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [values[int(i * step)] for i in range(width - 1)] + [values[-1]]
+    low, high = min(values), max(values)
+    if high == low:
+        return SPARK_CHARS[len(SPARK_CHARS) // 2] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[int((v - low) * scale)] for v in values)
+
+def _price(value: Optional[float]) -> str:
+    if value is None:
+        return "N/A"
+    # Memecoin prices span many orders of magnitude
+    return f"${value:,.2f}" if value >= 1 else f"${value:.4g}"
+
+def format_history_response(address: str, range_name: str, resolution: int, buckets: List[Dict[str, Any]]) -> str:
+    """Build the /history reply from rollup buckets (oldest first)"""
+    short = f"{address[:6]}...{address[-4:]}"
+    header = f"**{short} over {range_name}** ({len(buckets)} x {RESOLUTION_NAMES[resolution]} buckets)"
+    closes = [b['price_close'] for b in buckets if b['price_close'] is not None]
+    highs = [b['price_high'] for b in buckets if b['price_high'] is not None]
+    lows = [b['price_low'] for b in buckets if b['price_low'] is not None]
+    lines = [header]
+    if closes:
+        first = next(b['price_open'] for b in buckets if b['price_open'] is not None)
+        change = f" ({(closes[-1] - first) / first:+.1%})" if first else ""
+        lines.append(f"Price: {_price(first)} -> {_price(closes[-1])}{change}, high {_price(max(highs))}, low {_price(min(lows))}")
+        lines.append(f"`{sparkline(closes)}`")
+    market_caps = [b['market_cap'] for b in buckets if b['market_cap'] is not None]
+    if market_caps:
+        lines.append(f"Market Cap: ${market_caps[0]:,.0f} -> ${market_caps[-1]:,.0f}")
+    latest = buckets[-1]
+    if latest['liquidity'] is not None:
+        lines.append(f"Liquidity: ${latest['liquidity']:,.0f}")
+    if latest['rugcheck_score'] is not None:
+        lines.append(f"Rugcheck score: {latest['rugcheck_score']}")
+    lines.append(f"_{sum(b['samples'] for b in buckets)} snapshots_")
+    return "\n".join(lines)
+
+# Per-user cap on /watch + /alert subscriptions
+MAX_SUBSCRIPTIONS_PER_USER = 25
+
+def format_subscription(subscription: Subscription) -> str:
+    short = f"{subscription.address[:6]}...{subscription.address[-4:]}"
+    label = "price" if subscription.metric == METRIC_PRICE else "market cap"
+    if subscription.kind == KIND_WATCH:
+        return f"`#{subscription.id}` watch `{short}` {label}, notify on {subscription.threshold:g}% moves"
+    return f"`#{subscription.id}` alert `{short}` {label} {subscription.op} ${subscription.threshold:,.6g}"
+
+# Upper bound on rows per /detections reply
+MAX_DETECTIONS = 20
+
+def format_detection(coin: Dict[str, Any]) -> str:
+    """One line per scanner detection: token, event type, price and age"""
+    address = coin.get('id') or ""
+    age = time.monotonic() - coin['validated_at'] if coin.get('validated_at') else None
+    line = f"**{coin.get('name') or 'Unknown'}** `{address[:6]}...{address[-4:]}` {coin.get('event_type')} at ${coin.get('price') or 0:,.6g}"
+    return line + (f" _({int(age)}s ago)_" if age is not None else "")
+
+def _ms(seconds: Optional[float]) -> str:
+    return "n/a" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+def format_stats(client: PonderBot) -> str:
+    """Admin /stats reply: command and upstream latency, caches and queue depths"""
+    lines = ["**Commands** (p50 / p99 / count)"]
+    for (command, outcome), (_, _, count) in sorted(COMMAND_LATENCY.series().items()):
+        p50, p99 = COMMAND_LATENCY.quantile(0.5, command, outcome), COMMAND_LATENCY.quantile(0.99, command, outcome)
+        suffix = "" if outcome == "ok" else f" ({outcome})"
+        lines.append(f"/{command}{suffix}: {_ms(p50)} / {_ms(p99)} / {count}")
+
+    lines.append("**Upstreams** (p50 / p99, responses by status)")
+    responses = UPSTREAM_RESPONSES.values()
+    for (host,), (_, _, count) in sorted(UPSTREAM_LATENCY.series().items()):
+        statuses = ", ".join(f"{status}={int(n)}" for (h, status), n in sorted(responses.items()) if h == host)
+        lines.append(f"{host}: {_ms(UPSTREAM_LATENCY.quantile(0.5, host))} / {_ms(UPSTREAM_LATENCY.quantile(0.99, host))}, {statuses}")
+
+    lines.append("**Caches**")
+    for name, stats in client.dex_service.cache_stats().items():
+        lines.append(f"{name}: hit ratio {stats['hit_ratio']:.0%}, {stats['size']}/{stats['maxsize']} entries")
+    lines.append(f"known-missing answers: {client.dex_service.negative_hits}")
+
+    lines.append("**Queues**")
+    lines.append(
+        f"DB writes pending: {client.database.pending_writes}, "
+        f"query log buffered: {client.query_log.pending}, "
+        f"upstream requests waiting: {client.dex_service.scheduler.queue_depth()}"
+    )
+    scanner = client.scanner.stats()
+    if scanner['running']:
+        lines.append("**Scanner**")
+        lines.append(
+            f"profile polls: {scanner['polls']}, new tokens: {scanner['new_tokens']}, "
+            f"detections kept: {scanner['detections']}, restarts: {scanner['restarts']}"
+        )
+    return "\n".join(lines)
 
 def setup_commands(client: PonderBot):
     @client.tree.command(name="sync", description="Syncs the command tree (Admin only)")
@@ -14,17 +180,23 @@ def setup_commands(client: PonderBot):
         try:
             # Defer the response since syncing might take a moment
             await interaction.response.defer(ephemeral=True)
-            print('syncing...')
-            # Sync the command tree
-            await client.tree.sync()
+            logger.info("syncing command tree (requested by %s)", interaction.user.id)
+            # Sync the command tree; forced, since the caller asked for it explicitly
+            await client.sync_commands(force=True)
             
             await interaction.followup.send("Successfully synced bot commands!", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"An error occurred while syncing: {str(e)}", ephemeral=True)
 
+    @client.tree.command(name="stats", description="Shows latency, cache and queue statistics (Admin only)")
+    async def stats(interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You must be an administrator to use this command.", ephemeral=True)
+            return
+        await interaction.response.send_message(format_stats(client), ephemeral=True)
+
     @client.tree.command(name="ping", description="Responds with Pong!")
     async def ping(interaction: discord.Interaction):
-        print("pinged")
         await interaction.response.send_message("Pong!")
     
     @client.tree.command(name="hello", description="Says hello to the user")
@@ -38,36 +210,145 @@ def setup_commands(client: PonderBot):
         if not DexScreenerService.is_valid_pair_id(token_address):
             await interaction.response.send_message("Input is not a valid address")
             return
+        # One key for the tokens table, caches and blacklist, whatever case the user typed
+        token_address = address_key(token_address)
         
         # Defer reply since we're making an API call
         await interaction.response.defer()
         
         try:
-            pair_info = await DexScreenerService.fetch_pair_info(token_address)
-            rugcheck_info = await DexScreenerService.fetch_rugcheck(token_address)
-            print(rugcheck_info)
-            if pair_info:
-                # Format the response
-                response = (
-                    f"URL: {pair_info.get('url', 'N/A')}\n"
-                    f"DEX ID: {pair_info.get('dexId', 'N/A')}\n"
-                    f"Market Cap: ${pair_info.get('marketCap', 0):,.2f}\n"
-                    f"Quote Token: {pair_info.get('quoteToken', {}).get('name', 'N/A')}\n"
-                    f"Rugcheck score: {rugcheck_info.get('score', 0)}"
-                )
-                await interaction.followup.send(response)
+            # Served from the tokens table when possible, upstream otherwise
+            result = await client.token_lookup.lookup(token_address)
+            if result.record:
+                warnings = client.blacklist.flags(token_address, result.record.get('creator'))
+                await interaction.followup.send(format_check_response(result, warnings))
+            elif result.statuses.get('pair') != SOURCE_OK:
+                await interaction.followup.send(f"DexScreener {result.statuses['pair']}, no pair information available right now")
             else:
                 await interaction.followup.send("No pair information found for this ID")
         except Exception as e:
             await interaction.followup.send(f"An error occurred while fetching the pair information: {str(e)}")
 
-    
+    @client.tree.command(name="checkmany", description=f"Check up to {MAX_CHECKMANY} token addresses at once (comma or space separated).")
+    async def checkmany(interaction: discord.Interaction, token_addresses: str):
+        # Split, normalize, de-duplicate (keeping order) and validate the input
+        addresses = list(dict.fromkeys(address_key(a) for a in re.split(r"[\s,]+", token_addresses) if a))
+        if not addresses:
+            await interaction.response.send_message("Provide at least one token address")
+            return
+        if len(addresses) > MAX_CHECKMANY:
+            await interaction.response.send_message(f"At most {MAX_CHECKMANY} addresses per request")
+            return
+        invalid = [a for a in addresses if not DexScreenerService.is_valid_pair_id(a)]
+        if invalid:
+            await interaction.response.send_message(f"Not valid addresses: {', '.join(invalid)}")
+            return
+
+        await interaction.response.defer()
+
+        try:
+            # Concurrent lookups are folded into multi-address DexScreener requests by the batcher
+            results = await asyncio.gather(*(client.token_lookup.lookup(a) for a in addresses))
+            lines = [
+                format_checkmany_line(a, r, client.blacklist.flags(a, (r.record or {}).get('creator')))
+                for a, r in zip(addresses, results)
+            ]
+            await interaction.followup.send("\n".join(lines))
+        except Exception as e:
+            await interaction.followup.send(f"An error occurred while fetching the pair information: {str(e)}")
+
+    @client.tree.command(name="history", description="Price, market cap and liquidity history recorded for a token")
+    @app_commands.describe(token_address="Token address", period="How far back to look (default 24h)")
+    @app_commands.choices(period=[app_commands.Choice(name=name, value=name) for name in HISTORY_RANGES])
+    async def history(interaction: discord.Interaction, token_address: str, period: Optional[app_commands.Choice[str]] = None):
+        if not DexScreenerService.is_valid_pair_id(token_address):
+            await interaction.response.send_message("Input is not a valid address")
+            return
+        range_name = period.value if period else "24h"
+        span = HISTORY_RANGES[range_name]
+        resolution = pick_resolution(span, client.timeseries.retention)
+        try:
+            # Rollups only; never calls DexScreener
+            buckets = await client.timeseries.history(token_address, time.time() - span, resolution)
+        except Exception as e:
+            await interaction.response.send_message(f"An error occurred while reading the history: {str(e)}")
+            return
+        if not buckets:
+            await interaction.response.send_message(f"No history recorded for this token in the last {range_name}; /check it to start recording")
+            return
+        await interaction.response.send_message(format_history_response(token_address, range_name, resolution, buckets))
+
+    async def subscribe(interaction: discord.Interaction, token_address: str, kind: str, metric: str, op: str, threshold: float) -> Optional[int]:
+        # Shared validation for /watch and /alert; replies and returns None when rejected
+        if not DexScreenerService.is_valid_pair_id(token_address):
+            await interaction.response.send_message("Input is not a valid address", ephemeral=True)
+            return None
+        if threshold <= 0:
+            await interaction.response.send_message("Threshold must be greater than zero", ephemeral=True)
+            return None
+        if await client.subscriptions.count_for_user(interaction.user.id) >= MAX_SUBSCRIPTIONS_PER_USER:
+            await interaction.response.send_message(f"You already have {MAX_SUBSCRIPTIONS_PER_USER} subscriptions; remove some with /unwatch or /unalert", ephemeral=True)
+            return None
+        return await client.subscriptions.add(
+            interaction.user.id, interaction.channel_id, interaction.guild_id, token_address, kind, metric, op, threshold
+        )
+
+    @client.tree.command(name="watch", description="Get notified in this channel when a token's price moves")
+    @app_commands.describe(token_address="Token address", move_percent="Notify after a move of this many percent (default 10)")
+    async def watch(interaction: discord.Interaction, token_address: str, move_percent: Optional[float] = 10.0):
+        subscription_id = await subscribe(interaction, token_address, KIND_WATCH, METRIC_PRICE, OP_MOVE, move_percent)
+        if subscription_id is not None:
+            await interaction.response.send_message(f"Watching `{token_address}`; you will be notified here on {move_percent:g}% price moves")
+
+    @client.tree.command(name="unwatch", description="Stop watching a token")
+    async def unwatch(interaction: discord.Interaction, token_address: str):
+        removed = await client.subscriptions.remove_for_user(interaction.user.id, address=token_address, kind=KIND_WATCH)
+        await interaction.response.send_message("Stopped watching" if removed else "You are not watching this token", ephemeral=True)
+
+    @client.tree.command(name="alert", description="One-time alert in this channel when price or market cap crosses a threshold")
+    @app_commands.describe(token_address="Token address", metric="Value to watch", direction="Fire when the value goes above or below", threshold="Threshold in USD")
+    @app_commands.choices(
+        metric=[app_commands.Choice(name="price", value=METRIC_PRICE), app_commands.Choice(name="market cap", value=METRIC_MARKET_CAP)],
+        direction=[app_commands.Choice(name="above", value=OP_ABOVE), app_commands.Choice(name="below", value=OP_BELOW)],
+    )
+    async def alert(interaction: discord.Interaction, token_address: str, metric: app_commands.Choice[str],
+                    direction: app_commands.Choice[str], threshold: float):
+        subscription_id = await subscribe(interaction, token_address, KIND_ALERT, metric.value, direction.value, threshold)
+        if subscription_id is not None:
+            await interaction.response.send_message(
+                f"Alert `#{subscription_id}` set: {metric.name} of `{token_address}` {direction.value} ${threshold:,.6g}"
+            )
+
+    @client.tree.command(name="unalert", description="Remove one of your price alerts by id (see /alerts)")
+    async def unalert(interaction: discord.Interaction, alert_id: int):
+        removed = await client.subscriptions.remove_for_user(interaction.user.id, kind=KIND_ALERT, subscription_id=alert_id)
+        await interaction.response.send_message("Alert removed" if removed else "No such alert", ephemeral=True)
+
+    @client.tree.command(name="alerts", description="List your watches and price alerts")
+    async def alerts(interaction: discord.Interaction):
+        subscriptions = await client.subscriptions.for_user(interaction.user.id)
+        if not subscriptions:
+            await interaction.response.send_message("You have no watches or alerts", ephemeral=True)
+            return
+        await interaction.response.send_message("\n".join(format_subscription(s) for s in subscriptions), ephemeral=True)
+
+    @client.tree.command(name="detections", description="Latest tokens flagged by the scanner")
+    @app_commands.describe(limit=f"How many to show (max {MAX_DETECTIONS})")
+    async def detections(interaction: discord.Interaction, limit: Optional[int] = 10):
+        if not client.scanner.running:
+            await interaction.response.send_message("The scanner is not running in this bot process", ephemeral=True)
+            return
+        coins = client.scanner.detections(max(1, min(limit, MAX_DETECTIONS)))
+        if not coins:
+            await interaction.response.send_message("No detections yet")
+            return
+        await interaction.response.send_message("\n".join(format_detection(coin) for coin in coins))
+
     @client.tree.command(name="getfirst", description="Get the URL of the first token profile from DexScreener")
     async def getfirst(interaction: discord.Interaction):
         await interaction.response.defer()
-        print("dex")
         try:
-            url = await DexScreenerService.fetch_first_token_url()
+            url = await client.dex_service.fetch_first_token_url()
             if url:
                 await interaction.followup.send(f"First token profile URL: {url}")
             else:
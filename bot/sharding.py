@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Discord lets a bot identify max_concurrency shards per this many seconds
+IDENTIFY_INTERVAL = 5.0
+
+# A worker that stayed up this long is considered healthy; its restart backoff resets
+HEALTHY_UPTIME = 60.0
+MAX_RESTART_DELAY = 60.0
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shard ids 0..shard_count-1 into contiguous groups, one per worker"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+async def fetch_gateway_info(token: str) -> Tuple[int, int]:
+    """Discord's recommended shard count and identify max_concurrency for this bot"""
+    import discord
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, session_start_limit = await http.get_bot_gateway()
+        return shards, session_start_limit.get('max_concurrency', 1)
+    finally:
+        await http.close()
+
+def run_worker(index: int, shard_ids: List[int], shard_count: int, started_at: float, workers: int = 1):
+    """Worker process entry point: one AutoShardedClient for a range of shards"""
+    from config import ALERT_POLL_INTERVAL, DEV_GUILD_ID, DISCORD_TOKEN, LOG_JSON, LOG_LEVEL, METRICS_PORT, SCANNER_CONFIG
+    from bot.client import PonderBot
+    from bot.commands import setup_commands
+    from services.logs import setup_logging
+
+    setup_logging(LOG_LEVEL, json_output=LOG_JSON)
+    client = PonderBot(
+        dev_guild_id=DEV_GUILD_ID,
+        started_at=started_at,
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        primary=index == 0,
+        metrics_port=METRICS_PORT + index if METRICS_PORT else None,
+        alert_interval=ALERT_POLL_INTERVAL,
+        scanner_config=SCANNER_CONFIG,
+        workers=workers,
+    )
+    setup_commands(client)
+    client.run(DISCORD_TOKEN, log_handler=None)
+
+class ShardSupervisor:
+    """Runs each shard range in its own process and restarts workers that die.
+
+    Worker 0 is the primary: only it syncs the command tree and purges the
+    shared blacklist. Workers are started staggered so their combined
+    IDENTIFYs stay inside Discord's session start limit. SIGINT/SIGTERM stop
+    every worker before the launcher exits.
+    """
+
+    def __init__(self, shard_count: int, workers: int, max_concurrency: int = 1):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._started: Dict[int, float] = {}
+        self._restarts: Dict[int, int] = {}
+        self._stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        for index, shard_ids in enumerate(self.ranges):
+            if self._stopping:
+                break
+            self._spawn(index)
+            if index < len(self.ranges) - 1:
+                self._sleep(IDENTIFY_INTERVAL * len(shard_ids) / self.max_concurrency)
+        try:
+            self._supervise()
+        finally:
+            self._stop_all()
+
+    def _spawn(self, index: int):
+        shard_ids = self.ranges[index]
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, shard_ids, self.shard_count, time.monotonic(), len(self.ranges)),
+            name=f"ponderbot-shards-{shard_ids[0]}-{shard_ids[-1]}",
+        )
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
+        logger.info("Started worker %s (pid %s) for shards %s-%s of %s", index, process.pid, shard_ids[0], shard_ids[-1], self.shard_count)
+
+    def _supervise(self):
+        while not self._stopping and self._processes:
+            sentinels = {process.sentinel: index for index, process in self._processes.items()}
+            for sentinel in wait(list(sentinels), timeout=1.0):
+                index = sentinels[sentinel]
+                process = self._processes.pop(index)
+                process.join()
+                if self._stopping:
+                    continue
+                uptime = time.monotonic() - self._started[index]
+                if uptime >= HEALTHY_UPTIME:
+                    self._restarts[index] = 0
+                attempt = self._restarts.get(index, 0)
+                self._restarts[index] = attempt + 1
+                delay = min(MAX_RESTART_DELAY, IDENTIFY_INTERVAL * (2 ** attempt))
+                logger.warning("Worker %s exited with code %s after %.0fs, restarting in %.0fs", index, process.exitcode, uptime, delay)
+                self._sleep(delay)
+                if not self._stopping:
+                    self._spawn(index)
+
+    def _sleep(self, seconds: float):
+        # Sleep in small steps so a stop request is honored promptly
+        deadline = time.monotonic() + seconds
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(0.5, deadline - time.monotonic()))
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _stop_all(self, timeout: float = 15.0):
+        # SIGINT makes client.run() close cleanly (flush query log, close the database)
+        for process in self._processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        self._processes.clear()
+
+def run_sharded(token: str, workers: int, shard_count: Optional[int] = None):
+    """Launcher: size the shard set from Discord (unless given) and supervise the workers"""
+    recommended, max_concurrency = asyncio.run(fetch_gateway_info(token))
+    shard_count = shard_count or recommended
+    logger.info("Running %s shards across %s worker processes", shard_count, min(workers, shard_count))
+    ShardSupervisor(shard_count, workers, max_concurrency).run()
@@ -4,4 +4,23 @@ import os
 load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 if not DISCORD_TOKEN:
-    raise ValueError("No Discord token found in environment variables!")
\ No newline at end of file
+    raise ValueError("No Discord token found in environment variables!")
+
+# Optional: sync slash commands to this guild only (development)
+DEV_GUILD_ID = int(os.getenv('DEV_GUILD_ID')) if os.getenv('DEV_GUILD_ID') else None
+
+# Sharded mode: number of worker processes (1 = single process) and optional total shard count
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '1'))
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+
+# Optional: serve Prometheus metrics on 127.0.0.1:<port> (sharded workers use port + worker index)
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# LOG_FORMAT=json writes one JSON object per log line instead of plain text
+LOG_JSON = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+
+# Seconds between watchlist/price-alert polls
+ALERT_POLL_INTERVAL = float(os.getenv('ALERT_POLL_INTERVAL', '30'))
+
+# In-process scanner (services/test.py) config; runs on the primary worker when the file exists, empty disables it
+SCANNER_CONFIG = os.getenv('SCANNER_CONFIG', 'config.yaml')
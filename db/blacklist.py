@@ -0,0 +1,186 @@
+# db/blacklist.py
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from services.pairs import address_key
+
+KIND_COIN = "coin"
+KIND_DEV = "dev"
+
+REASON_CONFIG = "config"
+REASON_MANUAL = "manual"
+REASON_BUNDLED = "bundled_supply"
+
+# Seconds an entry stays blacklisted, per reason; None never expires
+DEFAULT_TTLS: Dict[str, Optional[float]] = {
+    REASON_CONFIG: None,
+    REASON_MANUAL: None,
+    REASON_BUNDLED: 30 * 24 * 3600.0,
+}
+
+class BlacklistStore:
+    """Coin/developer blacklist backed by an indexed SQLite table.
+
+    Membership checks hit in-memory sets that are loaded once and then kept
+    current: add() updates them directly, and refresh() pulls in rows
+    written by other processes since the last refresh. Entries expire per
+    reason (see DEFAULT_TTLS); purge_expired() removes them from both the
+    table and memory. Values are stored as address_key() so lookups match
+    EVM addresses regardless of case.
+    """
+
+    def __init__(self, db_path: str = "blacklist.db", ttls: Optional[Dict[str, Optional[float]]] = None):
+        self.db_path = db_path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._sets: Dict[str, Set[str]] = {KIND_COIN: set(), KIND_DEV: set()}
+        self._expires: Dict[Tuple[str, str], float] = {}
+        self._refreshed_at = 0.0
+        self.init_database()
+        self.load()
+
+    def init_database(self):
+        """Initialize the blacklist table and its indexes"""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS blacklist (
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL,
+                    PRIMARY KEY (kind, value)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_blacklist_updated_at ON blacklist (updated_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_blacklist_expires_at ON blacklist (expires_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_blacklist_reason ON blacklist (reason, created_at)")
+
+    def load(self):
+        """(Re)load every live entry into memory"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, value, expires_at, updated_at FROM blacklist WHERE expires_at IS NULL OR expires_at > ?",
+                (now,),
+            ).fetchall()
+            for kind_set in self._sets.values():
+                kind_set.clear()
+            self._expires.clear()
+            self._apply(rows)
+            self._refreshed_at = max((row[3] for row in rows), default=now)
+
+    def refresh(self) -> int:
+        """Pull in entries added or changed by other processes; returns how many"""
+        with self._lock:
+            # Small overlap so rows committed in the same instant are not missed
+            rows = self._conn.execute(
+                "SELECT kind, value, expires_at, updated_at FROM blacklist WHERE updated_at >= ?",
+                (self._refreshed_at - 1.0,),
+            ).fetchall()
+            self._apply(rows)
+            if rows:
+                self._refreshed_at = max(self._refreshed_at, max(row[3] for row in rows))
+        return len(rows)
+
+    def add(self, kind: str, value: str, reason: str = REASON_MANUAL):
+        self.add_many([(kind, value)], reason)
+
+    def add_many(self, entries: Iterable[Tuple[str, str]], reason: str = REASON_MANUAL):
+        """Blacklist (kind, value) pairs; re-adding an entry renews its expiry"""
+        now = time.time()
+        ttl = self.ttls.get(reason)
+        expires_at = now + ttl if ttl is not None else None
+        rows = [(kind, address_key(value), reason, now, now, expires_at) for kind, value in entries if value]
+        if not rows:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("""
+                    INSERT INTO blacklist (kind, value, reason, created_at, updated_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(kind, value) DO UPDATE SET
+                        reason = excluded.reason,
+                        updated_at = excluded.updated_at,
+                        expires_at = CASE
+                            WHEN blacklist.expires_at IS NULL OR excluded.expires_at IS NULL THEN NULL
+                            ELSE MAX(blacklist.expires_at, excluded.expires_at)
+                        END
+                """, rows)
+            for kind, value, _, _, _, row_expires in rows:
+                # Mirror the CASE above: permanent entries stay permanent, otherwise the later expiry wins
+                kind_set = self._sets.setdefault(kind, set())
+                permanent = value in kind_set and (kind, value) not in self._expires
+                kind_set.add(value)
+                if row_expires is None or permanent:
+                    self._set_expiry(kind, value, None)
+                else:
+                    self._set_expiry(kind, value, max(row_expires, self._expires.get((kind, value), 0.0)))
+
+    def contains(self, kind: str, value: Optional[str]) -> bool:
+        if not value or value not in self._sets.get(kind, ()):
+            return False
+        expires_at = self._expires.get((kind, value))
+        if expires_at is not None and expires_at <= time.time():
+            self._sets[kind].discard(value)
+            del self._expires[(kind, value)]
+            return False
+        return True
+
+    def members(self, kind: str) -> Set[str]:
+        """Live in-memory set for bulk checks (e.g. pandas isin); do not mutate"""
+        return self._sets.setdefault(kind, set())
+
+    def flags(self, token_address: str, dev_address: Optional[str] = None) -> List[str]:
+        """Human-readable warnings for a token and (if known) its developer"""
+        warnings = []
+        if self.contains(KIND_COIN, token_address):
+            warnings.append("Token is blacklisted")
+        if self.contains(KIND_DEV, dev_address):
+            warnings.append(f"Developer {dev_address} is blacklisted")
+        return warnings
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from the table and from memory"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM blacklist WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+                ).rowcount
+            for (kind, value), expires_at in list(self._expires.items()):
+                if expires_at <= now:
+                    self._sets[kind].discard(value)
+                    del self._expires[(kind, value)]
+        return deleted
+
+    def size(self) -> Dict[str, int]:
+        return {kind: len(values) for kind, values in self._sets.items()}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _apply(self, rows):
+        now = time.time()
+        for kind, value, expires_at, _ in rows:
+            # Rows written before values were stored as address keys
+            value = address_key(value)
+            if expires_at is not None and expires_at <= now:
+                self._sets.setdefault(kind, set()).discard(value)
+                self._expires.pop((kind, value), None)
+                continue
+            self._sets.setdefault(kind, set()).add(value)
+            self._set_expiry(kind, value, expires_at)
+
+    def _set_expiry(self, kind: str, value: str, expires_at: Optional[float]):
+        if expires_at is None:
+            self._expires.pop((kind, value), None)
+        else:
+            self._expires[(kind, value)] = expires_at
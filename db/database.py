@@ -1,26 +1,113 @@
 # db/database.py
+import asyncio
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, List, Dict
+from typing import Any, Callable, List, Dict, Optional
+
+# Applied to every long-lived connection. WAL lets readers run alongside the
+# single writer, and synchronous=NORMAL only fsyncs at checkpoints under WAL.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA foreign_keys = ON",
+)
 
 class Database:
-    def __init__(self, db_path: str = "bot.db"):
+    """SQLite store with an async API.
+
+    Writes are serialized on one dedicated writer thread and reads go through
+    a small reader pool. Each thread keeps its own long-lived connection, so
+    awaiting a query never blocks the event loop on connect or fsync.
+    """
+
+    def __init__(self, db_path: str = "bot.db", readers: int = 4):
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        self.pending_writes = 0
         self.init_database()
-    
+
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        """Short-lived connection for one-off synchronous use (schema setup, scripts)"""
+        conn = self._connect()
         try:
             yield conn
         finally:
             conn.close()
-    
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _thread_connection(self, readonly: bool) -> sqlite3.Connection:
+        # Lazily open one connection per executor thread and keep it
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect(readonly)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call_write(self, fn: Callable[..., Any], args: tuple) -> Any:
+        conn = self._thread_connection(readonly=False)
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _call_read(self, fn: Callable[..., Any], args: tuple) -> Any:
+        return fn(self._thread_connection(readonly=True), *args)
+
+    async def run_write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(conn, *args) in a transaction on the writer thread"""
+        self.pending_writes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._writer, self._call_write, fn, args)
+        finally:
+            self.pending_writes -= 1
+
+    async def run_read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(conn, *args) on a pooled read-only connection"""
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._call_read, fn, args)
+
+    async def close(self):
+        """Drain queued writes, then close every pooled connection"""
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
     def init_database(self):
         """Initialize the database with required tables"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
+
+            # WAL is persistent on the file, so setting it once here is enough
+            cursor.execute("PRAGMA journal_mode = WAL")
+
             # Create tokens table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tokens (
@@ -29,10 +116,23 @@ class Database:
                     market_cap REAL,
                     quote_token TEXT,
                     rugcheck_score INTEGER,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    url TEXT,
+                    creator TEXT
                 )
             """)
-            
+
+            # Older databases were created before these columns existed
+            columns = {row['name'] for row in cursor.execute("PRAGMA table_info(tokens)")}
+            for column in ('url', 'creator'):
+                if column not in columns:
+                    try:
+                        cursor.execute(f"ALTER TABLE tokens ADD COLUMN {column} TEXT")
+                    except sqlite3.OperationalError as e:
+                        # Another worker process migrated the table first
+                        if "duplicate column" not in str(e):
+                            raise
+
             # Create user_queries table to track user interactions
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS user_queries (
@@ -44,49 +144,79 @@ class Database:
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            
-            conn.commit()
-    
-    def save_token_info(self, token_data: Dict[str, Any]):
-        """Save token information to database"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO tokens 
-                (address, dex_id, market_cap, quote_token, rugcheck_score, last_updated)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                token_data.get('address'),
-                token_data.get('dexId'),
-                token_data.get('marketCap', 0),
-                token_data.get('quoteToken', {}).get('name'),
-                token_data.get('rugcheck_score', 0)
-            ))
+
             conn.commit()
-    
-    def log_user_query(self, user_id: str, user_name: str, query_type: str, query_content: str):
+
+    async def save_token_info(self, token_data: Dict[str, Any]):
+        """Save token information to database, keeping the last known rugcheck score if none is given"""
+        await self.run_write(self._save_token_info, token_data)
+
+    @staticmethod
+    def _save_token_info(conn: sqlite3.Connection, token_data: Dict[str, Any]):
+        conn.execute("""
+            INSERT INTO tokens
+            (address, url, dex_id, market_cap, quote_token, rugcheck_score, creator, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(address) DO UPDATE SET
+                url = excluded.url,
+                dex_id = excluded.dex_id,
+                market_cap = excluded.market_cap,
+                quote_token = excluded.quote_token,
+                rugcheck_score = COALESCE(excluded.rugcheck_score, tokens.rugcheck_score),
+                creator = COALESCE(excluded.creator, tokens.creator),
+                last_updated = excluded.last_updated
+        """, (
+            token_data.get('address'),
+            token_data.get('url'),
+            token_data.get('dexId'),
+            token_data.get('marketCap'),
+            token_data.get('quoteToken'),
+            token_data.get('rugcheck_score'),
+            token_data.get('creator')
+        ))
+
+    async def log_user_query(self, user_id: str, user_name: str, query_type: str, query_content: str):
         """Log user queries for analytics"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO user_queries (user_id, user_name, query_type, query_content)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, user_name, query_type, query_content))
-            conn.commit()
-    
-    def get_token_info(self, address: str) -> Dict[str, Any]:
-        """Retrieve token information from database"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM tokens WHERE address = ?", (address,))
-            row = cursor.fetchone()
-            if row:
-                return {
-                    'address': row[0],
-                    'dexId': row[1],
-                    'marketCap': row[2],
-                    'quoteToken': row[3],
-                    'rugcheck_score': row[4],
-                    'last_updated': row[5]
-                }
-            return None
\ No newline at end of file
+        await self.run_write(self._log_user_query, user_id, user_name, query_type, query_content)
+
+    @staticmethod
+    def _log_user_query(conn: sqlite3.Connection, user_id: str, user_name: str, query_type: str, query_content: str):
+        conn.execute("""
+            INSERT INTO user_queries (user_id, user_name, query_type, query_content)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, user_name, query_type, query_content))
+
+    async def log_user_queries(self, rows: List[tuple]):
+        """Log a batch of (user_id, user_name, query_type, query_content, timestamp) rows in one transaction"""
+        await self.run_write(self._log_user_queries, rows)
+
+    @staticmethod
+    def _log_user_queries(conn: sqlite3.Connection, rows: List[tuple]):
+        conn.executemany("""
+            INSERT INTO user_queries (user_id, user_name, query_type, query_content, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+    async def get_token_info(self, address: str) -> Optional[Dict[str, Any]]:
+        """Retrieve token information from database, including its age in seconds"""
+        return await self.run_read(self._get_token_info, address)
+
+    @staticmethod
+    def _get_token_info(conn: sqlite3.Connection, address: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute("""
+            SELECT *, (julianday('now') - julianday(last_updated)) * 86400.0 AS age_seconds
+            FROM tokens WHERE address = ?
+        """, (address,)).fetchone()
+        if row:
+            return {
+                'address': row['address'],
+                'url': row['url'],
+                'dexId': row['dex_id'],
+                'marketCap': row['market_cap'],
+                'quoteToken': row['quote_token'],
+                'rugcheck_score': row['rugcheck_score'],
+                'creator': row['creator'],
+                'last_updated': row['last_updated'],
+                'age_seconds': row['age_seconds']
+            }
+        return None
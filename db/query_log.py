@@ -0,0 +1,107 @@
+# db/query_log.py
+import asyncio
+import datetime
+import logging
+from typing import List, Optional
+from db.database import Database
+
+logger = logging.getLogger(__name__)
+
+class QueryLogWriter:
+    """Write-behind buffer for the user_queries table.
+
+    Rows are collected in memory and flushed with one executemany per batch,
+    either when max_batch rows are waiting or every flush_interval seconds.
+    log_nowait() never waits: once max_buffer rows are pending, new rows are
+    dropped and counted. put() waits for room instead, for callers that can
+    afford it.
+    """
+
+    def __init__(self, database: Database, max_batch: int = 200, flush_interval: float = 2.0, max_buffer: int = 5000):
+        self.database = database
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[tuple] = []
+        self._flush_now = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="query-log-writer")
+
+    def log_nowait(self, user_id: str, user_name: str, query_type: str, query_content: str) -> bool:
+        """Queue a row without waiting; returns False if it was dropped"""
+        if self._closing or len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return False
+        self._append((user_id, user_name, query_type, query_content, self._timestamp()))
+        return True
+
+    async def put(self, user_id: str, user_name: str, query_type: str, query_content: str):
+        """Queue a row, waiting for a flush to free space if the buffer is full"""
+        while len(self._buffer) >= self.max_buffer:
+            self._has_room.clear()
+            await self._has_room.wait()
+        self._append((user_id, user_name, query_type, query_content, self._timestamp()))
+
+    async def close(self):
+        """Stop the background writer and flush whatever is still buffered"""
+        self._closing = True
+        self._flush_now.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while self._buffer:
+            if not await self._flush():
+                break
+
+    def _append(self, row: tuple):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_batch:
+            self._flush_now.set()
+
+    @staticmethod
+    def _timestamp() -> str:
+        # Same format as CURRENT_TIMESTAMP so rows compare correctly in SQL
+        return datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            while self._buffer:
+                if not await self._flush():
+                    break
+
+    async def _flush(self) -> bool:
+        batch = self._buffer[:self.max_batch]
+        del self._buffer[:len(batch)]
+        try:
+            await self.database.log_user_queries(batch)
+        except Exception as e:
+            # Put the batch back (if there is room) and retry on the next tick
+            self.failed_batches += 1
+            room = self.max_buffer - len(self._buffer)
+            self._buffer[:0] = batch[:room]
+            self.dropped += len(batch) - min(len(batch), room)
+            logger.error("query log flush failed: %r", e)
+            return False
+        finally:
+            if len(self._buffer) < self.max_buffer:
+                self._has_room.set()
+        self.written += len(batch)
+        return True
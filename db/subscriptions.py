@@ -0,0 +1,160 @@
+# db/subscriptions.py
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+from db.database import Database
+from services.pairs import address_key
+
+KIND_WATCH = "watch"
+KIND_ALERT = "alert"
+
+METRIC_PRICE = "price"
+METRIC_MARKET_CAP = "market_cap"
+
+OP_ABOVE = "above"
+OP_BELOW = "below"
+# Watches: fire when the metric moved by `threshold` percent from `reference`
+OP_MOVE = "move"
+
+@dataclass
+class Subscription:
+    id: int
+    user_id: int
+    channel_id: int
+    guild_id: Optional[int]
+    address: str
+    kind: str
+    metric: str
+    op: str
+    threshold: float
+    # Last notified value for watches; None until the first poll sees the token
+    reference: Optional[float]
+    created_at: float
+
+class SubscriptionStore:
+    """Watch and alert subscriptions in the bot database, indexed by token address"""
+
+    COLUMNS = "id, user_id, channel_id, guild_id, address, kind, metric, op, threshold, reference, created_at"
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the subscriptions table and its indexes"""
+        with self.database.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    guild_id INTEGER,
+                    address TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    threshold REAL NOT NULL,
+                    reference REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_subscriptions_address ON subscriptions (address)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_subscriptions_user ON subscriptions (user_id)")
+            conn.commit()
+
+    async def add(self, user_id: int, channel_id: int, guild_id: Optional[int], address: str,
+                  kind: str, metric: str, op: str, threshold: float) -> int:
+        """Insert a subscription and return its id; an identical watch is replaced rather than duplicated"""
+        return await self.database.run_write(
+            self._add, user_id, channel_id, guild_id, address_key(address), kind, metric, op, threshold, time.time()
+        )
+
+    @staticmethod
+    def _add(conn: sqlite3.Connection, user_id: int, channel_id: int, guild_id: Optional[int], address: str,
+             kind: str, metric: str, op: str, threshold: float, now: float) -> int:
+        if kind == KIND_WATCH:
+            # One watch per user and token; re-watching updates channel and threshold
+            conn.execute(
+                "DELETE FROM subscriptions WHERE user_id = ? AND address = ? AND kind = ?",
+                (user_id, address, KIND_WATCH),
+            )
+        return conn.execute("""
+            INSERT INTO subscriptions
+            (user_id, channel_id, guild_id, address, kind, metric, op, threshold, reference, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)
+        """, (user_id, channel_id, guild_id, address, kind, metric, op, threshold, now, now)).lastrowid
+
+    async def remove(self, ids: Iterable[int]) -> int:
+        """Delete subscriptions by id; returns rows removed"""
+        return await self.database.run_write(self._remove, [(i,) for i in ids])
+
+    @staticmethod
+    def _remove(conn: sqlite3.Connection, ids: Sequence[Tuple[int]]) -> int:
+        return conn.executemany("DELETE FROM subscriptions WHERE id = ?", ids).rowcount
+
+    async def remove_for_user(self, user_id: int, address: Optional[str] = None,
+                              kind: Optional[str] = None, subscription_id: Optional[int] = None) -> int:
+        """Delete a user's subscriptions matching every filter given; returns rows removed"""
+        return await self.database.run_write(
+            self._remove_for_user, user_id, address_key(address) if address else None, kind, subscription_id
+        )
+
+    @staticmethod
+    def _remove_for_user(conn: sqlite3.Connection, user_id: int, address: Optional[str],
+                         kind: Optional[str], subscription_id: Optional[int]) -> int:
+        return conn.execute("""
+            DELETE FROM subscriptions
+            WHERE user_id = ?
+              AND (? IS NULL OR address = ?)
+              AND (? IS NULL OR kind = ?)
+              AND (? IS NULL OR id = ?)
+        """, (user_id, address, address, kind, kind, subscription_id, subscription_id)).rowcount
+
+    async def set_references(self, updates: Sequence[Tuple[Optional[float], int]]):
+        """Store new (reference, id) values for watches after they fired or were first seen"""
+        await self.database.run_write(self._set_references, updates, time.time())
+
+    @staticmethod
+    def _set_references(conn: sqlite3.Connection, updates: Sequence[Tuple[Optional[float], int]], now: float):
+        conn.executemany(
+            "UPDATE subscriptions SET reference = ?, updated_at = ? WHERE id = ?",
+            [(reference, now, subscription_id) for reference, subscription_id in updates],
+        )
+
+    async def for_user(self, user_id: int) -> List[Subscription]:
+        return await self.database.run_read(self._for_user, user_id)
+
+    @classmethod
+    def _for_user(cls, conn: sqlite3.Connection, user_id: int) -> List[Subscription]:
+        rows = conn.execute(
+            f"SELECT {cls.COLUMNS} FROM subscriptions WHERE user_id = ? ORDER BY address, id", (user_id,)
+        ).fetchall()
+        return [Subscription(*row) for row in rows]
+
+    async def count_for_user(self, user_id: int) -> int:
+        return await self.database.run_read(self._count_for_user, user_id)
+
+    @staticmethod
+    def _count_for_user(conn: sqlite3.Connection, user_id: int) -> int:
+        return conn.execute("SELECT COUNT(*) FROM subscriptions WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    async def load_all(self) -> List[Subscription]:
+        return await self.database.run_read(self._load_all)
+
+    @classmethod
+    def _load_all(cls, conn: sqlite3.Connection) -> List[Subscription]:
+        rows = conn.execute(f"SELECT {cls.COLUMNS} FROM subscriptions ORDER BY address, id").fetchall()
+        return [Subscription(*row) for row in rows]
+
+    async def fingerprint(self) -> Tuple[int, int, float]:
+        """Cheap change detector: (row count, max id, last update); changes whenever any worker edits the table"""
+        return await self.database.run_read(self._fingerprint)
+
+    @staticmethod
+    def _fingerprint(conn: sqlite3.Connection) -> Tuple[int, int, float]:
+        row = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(MAX(updated_at), 0) FROM subscriptions"
+        ).fetchone()
+        return tuple(row)
@@ -0,0 +1,159 @@
+# db/timeseries.py
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from db.database import Database
+from services.pairs import address_key
+
+# Rollup bucket sizes in seconds: 1 minute, 1 hour, 1 day
+RESOLUTION_MINUTE = 60
+RESOLUTION_HOUR = 3600
+RESOLUTION_DAY = 86400
+RESOLUTIONS = (RESOLUTION_MINUTE, RESOLUTION_HOUR, RESOLUTION_DAY)
+
+# Seconds to keep raw samples (key 0) and each rollup resolution; None keeps forever
+RAW_SAMPLES = 0
+DEFAULT_RETENTION: Dict[int, Optional[float]] = {
+    RAW_SAMPLES: 2 * 86400.0,
+    RESOLUTION_MINUTE: 7 * 86400.0,
+    RESOLUTION_HOUR: 90 * 86400.0,
+    RESOLUTION_DAY: None,
+}
+
+def pick_resolution(span: float, retention: Dict[int, Optional[float]] = DEFAULT_RETENTION) -> int:
+    """Finest resolution that gives at most ~1000 points and still covers the span"""
+    for resolution in RESOLUTIONS:
+        keep = retention.get(resolution)
+        if span / resolution <= 1000 and (keep is None or keep >= span):
+            return resolution
+    return RESOLUTIONS[-1]
+
+class TimeSeriesStore:
+    """Append-only market snapshots per token, with 1m/1h/1d rollups.
+
+    Raw samples live in a WITHOUT ROWID table clustered on (address, ts),
+    one row per token per second at most. Each sample also updates its
+    rollup bucket at every resolution in the same transaction, so range
+    queries read at most about a thousand pre-aggregated rows instead of raw data.
+    purge() enforces the retention per resolution.
+    """
+
+    def __init__(self, database: Database, retention: Optional[Dict[int, Optional[float]]] = None):
+        self.database = database
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the sample and rollup tables"""
+        with self.database.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS token_samples (
+                    address TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    price REAL,
+                    market_cap REAL,
+                    liquidity REAL,
+                    rugcheck_score INTEGER,
+                    PRIMARY KEY (address, ts)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS token_rollups (
+                    address TEXT NOT NULL,
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    first_ts INTEGER NOT NULL,
+                    last_ts INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    price_open REAL,
+                    price_high REAL,
+                    price_low REAL,
+                    price_close REAL,
+                    market_cap REAL,
+                    liquidity REAL,
+                    rugcheck_score INTEGER,
+                    PRIMARY KEY (address, resolution, bucket)
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+
+    async def record(self, address: str, price: Optional[float], market_cap: Optional[float],
+                     liquidity: Optional[float], rugcheck_score: Optional[int], ts: Optional[float] = None):
+        """Append one snapshot; a second snapshot for the same token in the same second is ignored"""
+        sample = (address_key(address), int(ts if ts is not None else time.time()), price, market_cap, liquidity, rugcheck_score)
+        await self.database.run_write(self._record_many, [sample])
+
+    async def record_many(self, samples: Sequence[tuple]):
+        """Append (address, ts, price, market_cap, liquidity, rugcheck_score) rows in one transaction"""
+        samples = [(address_key(sample[0]), int(sample[1])) + tuple(sample[2:]) for sample in samples]
+        await self.database.run_write(self._record_many, samples)
+
+    @staticmethod
+    def _record_many(conn: sqlite3.Connection, samples: Sequence[tuple]):
+        for address, ts, price, market_cap, liquidity, rugcheck_score in samples:
+            inserted = conn.execute("""
+                INSERT OR IGNORE INTO token_samples (address, ts, price, market_cap, liquidity, rugcheck_score)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (address, ts, price, market_cap, liquidity, rugcheck_score)).rowcount
+            if not inserted:
+                continue
+            conn.executemany("""
+                INSERT INTO token_rollups
+                (address, resolution, bucket, first_ts, last_ts, samples, price_open, price_high, price_low, price_close,
+                 market_cap, liquidity, rugcheck_score)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(address, resolution, bucket) DO UPDATE SET
+                    samples = token_rollups.samples + 1,
+                    price_open = CASE WHEN excluded.first_ts < token_rollups.first_ts
+                        THEN COALESCE(excluded.price_open, token_rollups.price_open)
+                        ELSE COALESCE(token_rollups.price_open, excluded.price_open) END,
+                    price_high = MAX(COALESCE(token_rollups.price_high, excluded.price_high), COALESCE(excluded.price_high, token_rollups.price_high)),
+                    price_low = MIN(COALESCE(token_rollups.price_low, excluded.price_low), COALESCE(excluded.price_low, token_rollups.price_low)),
+                    price_close = CASE WHEN excluded.last_ts >= token_rollups.last_ts
+                        THEN COALESCE(excluded.price_close, token_rollups.price_close) ELSE token_rollups.price_close END,
+                    market_cap = CASE WHEN excluded.last_ts >= token_rollups.last_ts
+                        THEN COALESCE(excluded.market_cap, token_rollups.market_cap) ELSE token_rollups.market_cap END,
+                    liquidity = CASE WHEN excluded.last_ts >= token_rollups.last_ts
+                        THEN COALESCE(excluded.liquidity, token_rollups.liquidity) ELSE token_rollups.liquidity END,
+                    rugcheck_score = CASE WHEN excluded.last_ts >= token_rollups.last_ts
+                        THEN COALESCE(excluded.rugcheck_score, token_rollups.rugcheck_score) ELSE token_rollups.rugcheck_score END,
+                    first_ts = MIN(token_rollups.first_ts, excluded.first_ts),
+                    last_ts = MAX(token_rollups.last_ts, excluded.last_ts)
+            """, [
+                (address, resolution, ts - ts % resolution, ts, ts, price, price, price, price, market_cap, liquidity, rugcheck_score)
+                for resolution in RESOLUTIONS
+            ])
+
+    async def history(self, address: str, since: float, resolution: int) -> List[Dict[str, Any]]:
+        """Rollup buckets for one token from `since` (unix seconds) on, oldest first"""
+        return await self.database.run_read(self._history, address_key(address), int(since), resolution)
+
+    @staticmethod
+    def _history(conn: sqlite3.Connection, address: str, since: int, resolution: int) -> List[Dict[str, Any]]:
+        # Served by the (address, resolution, bucket) primary key: one range scan
+        rows = conn.execute("""
+            SELECT bucket, samples, price_open, price_high, price_low, price_close, market_cap, liquidity, rugcheck_score
+            FROM token_rollups
+            WHERE address = ? AND resolution = ? AND bucket >= ?
+            ORDER BY bucket
+        """, (address, resolution, since - since % resolution)).fetchall()
+        return [dict(row) for row in rows]
+
+    async def purge(self, now: Optional[float] = None) -> int:
+        """Delete samples and rollups past their retention; returns rows removed"""
+        return await self.database.run_write(self._purge, now if now is not None else time.time(), self.retention)
+
+    @staticmethod
+    def _purge(conn: sqlite3.Connection, now: float, retention: Dict[int, Optional[float]]) -> int:
+        # Runs rarely and in the background, so full scans are acceptable here
+        removed = 0
+        keep = retention.get(RAW_SAMPLES)
+        if keep is not None:
+            removed += conn.execute("DELETE FROM token_samples WHERE ts < ?", (int(now - keep),)).rowcount
+        for resolution in RESOLUTIONS:
+            keep = retention.get(resolution)
+            if keep is not None:
+                removed += conn.execute(
+                    "DELETE FROM token_rollups WHERE resolution = ? AND bucket < ?", (resolution, int(now - keep))
+                ).rowcount
+        return removed
@@ -1,10 +1,29 @@
-from config import DISCORD_TOKEN
+import time
+# Taken before the heavy imports so startup-to-ready covers them too
+STARTED_AT = time.monotonic()
+
+from config import ALERT_POLL_INTERVAL, DEV_GUILD_ID, DISCORD_TOKEN, LOG_JSON, LOG_LEVEL, METRICS_PORT, SCANNER_CONFIG, SHARD_COUNT, SHARD_WORKERS
 from bot.client import PonderBot
 from bot.commands import setup_commands
+from bot.sharding import run_sharded
+from services.logs import setup_logging
 
 def main():
-        client = PonderBot()
+        setup_logging(LOG_LEVEL, json_output=LOG_JSON)
+        # Sharded mode: a supervisor process runs shard ranges in separate worker processes
+        if SHARD_WORKERS > 1:
+            run_sharded(DISCORD_TOKEN, SHARD_WORKERS, SHARD_COUNT)
+            return
+        client = PonderBot(
+            dev_guild_id=DEV_GUILD_ID,
+            started_at=STARTED_AT,
+            shard_count=SHARD_COUNT,
+            metrics_port=METRICS_PORT,
+            alert_interval=ALERT_POLL_INTERVAL,
+            scanner_config=SCANNER_CONFIG,
+        )
         setup_commands(client)
-        client.run(DISCORD_TOKEN)
+        # Logging is configured above; do not let discord.py add a second handler
+        client.run(DISCORD_TOKEN, log_handler=None)
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
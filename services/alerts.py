@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from db.subscriptions import (
+    KIND_ALERT, METRIC_MARKET_CAP, METRIC_PRICE, OP_ABOVE, OP_BELOW, OP_MOVE,
+    Subscription, SubscriptionStore,
+)
+from services.dexscreener import DexScreenerService
+from services.metrics import REGISTRY
+from services.notifier import split_digest
+from services.pairs import PairSnapshot
+from services.ratelimit import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Column order of the per-token value matrix
+METRICS = (METRIC_PRICE, METRIC_MARKET_CAP)
+_METRIC_COLUMNS = {metric: column for column, metric in enumerate(METRICS)}
+_OP_CODES = {OP_ABOVE: 0, OP_BELOW: 1, OP_MOVE: 2}
+
+# Discord rejects messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+ALERTS_FIRED = REGISTRY.counter("ponderbot_alerts_fired_total", "Watch and alert notifications sent", ("kind",))
+
+class RuleSet:
+    """Every subscription as parallel numpy arrays, plus the distinct addresses they reference"""
+
+    def __init__(self, subscriptions: List[Subscription]):
+        self.subscriptions = subscriptions
+        self.addresses: List[str] = list(dict.fromkeys(s.address for s in subscriptions))
+        rows = {address: row for row, address in enumerate(self.addresses)}
+        self.token_index = np.fromiter((rows[s.address] for s in subscriptions), dtype=np.intp, count=len(subscriptions))
+        self.metric_index = np.fromiter((_METRIC_COLUMNS[s.metric] for s in subscriptions), dtype=np.intp, count=len(subscriptions))
+        self.ops = np.fromiter((_OP_CODES[s.op] for s in subscriptions), dtype=np.int8, count=len(subscriptions))
+        self.thresholds = np.fromiter((s.threshold for s in subscriptions), dtype=np.float64, count=len(subscriptions))
+        self.references = np.fromiter(
+            (np.nan if s.reference is None else s.reference for s in subscriptions), dtype=np.float64, count=len(subscriptions)
+        )
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+def value_matrix(addresses: List[str], snapshots: Dict[str, Optional[PairSnapshot]]) -> np.ndarray:
+    """(tokens x METRICS) float matrix; NaN where the token or the field is missing"""
+    values = np.full((len(addresses), len(METRICS)), np.nan)
+    for row, address in enumerate(addresses):
+        snapshot = snapshots.get(address)
+        if snapshot is None:
+            continue
+        for column, metric in enumerate(METRICS):
+            value = snapshot.price_usd if metric == METRIC_PRICE else snapshot.market_cap
+            if value is not None:
+                values[row, column] = value
+    return values
+
+def evaluate_rules(rules: RuleSet, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate every rule against the current values in one pass.
+
+    Returns (current value per rule, fired mask). Rules whose token has no
+    data never fire, and move rules without a usable (finite, non-zero)
+    reference never fire.
+    """
+    current = values[rules.token_index, rules.metric_index]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        moved = np.abs(current / rules.references - 1.0) * 100.0
+        fired = np.select(
+            [rules.ops == _OP_CODES[OP_ABOVE], rules.ops == _OP_CODES[OP_BELOW]],
+            [current >= rules.thresholds, current <= rules.thresholds],
+            default=moved >= rules.thresholds,
+        )
+    usable_reference = np.isfinite(rules.references) & (rules.references != 0)
+    fired &= (rules.ops != _OP_CODES[OP_MOVE]) | usable_reference
+    return current, fired & ~np.isnan(current)
+
+def _short(address: str) -> str:
+    return f"{address[:6]}...{address[-4:]}"
+
+def _value(metric: str, value: Optional[float]) -> str:
+    if value is None:
+        return "N/A"
+    if metric == METRIC_MARKET_CAP or value >= 1:
+        return f"${value:,.2f}"
+    return f"${value:.4g}"
+
+def format_notification(subscription: Subscription, current: float) -> str:
+    label = "price" if subscription.metric == METRIC_PRICE else "market cap"
+    token = f"`{_short(subscription.address)}`"
+    if subscription.op == OP_MOVE:
+        change = current / subscription.reference - 1.0
+        return (f"<@{subscription.user_id}> {token} {label} moved {change:+.1%} to "
+                f"{_value(subscription.metric, current)} (was {_value(subscription.metric, subscription.reference)})")
+    return (f"<@{subscription.user_id}> {token} {label} is {subscription.op} "
+            f"{_value(subscription.metric, subscription.threshold)}: now {_value(subscription.metric, current)}")
+
+class AlertEngine:
+    """Single poller behind /watch and /alert.
+
+    Each cycle collects the distinct addresses of all subscriptions, fetches
+    them through DexScreenerService (the pair batcher folds them into
+    multi-address requests, so the cost is one poll per distinct token
+    regardless of subscriber count), evaluates every rule at once with
+    numpy and posts the fired ones, one message per channel. Alerts are
+    one-shot; watches re-arm at the value they fired at.
+    """
+
+    def __init__(
+        self,
+        dex_service: DexScreenerService,
+        store: SubscriptionStore,
+        send: Callable[[int, str], Awaitable[Any]],
+        interval: float = 30.0,
+    ):
+        self.dex_service = dex_service
+        self.store = store
+        self.send = send
+        self.interval = interval
+        self.rules = RuleSet([])
+        self._fingerprint: Optional[Tuple[int, int, float]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reload(self, force: bool = False):
+        """Rebuild the rule arrays when any worker changed the subscriptions table"""
+        fingerprint = await self.store.fingerprint()
+        if force or fingerprint != self._fingerprint:
+            self.rules = RuleSet(await self.store.load_all())
+            self._fingerprint = fingerprint
+
+    async def poll_once(self) -> int:
+        """Run one cycle; returns the number of notifications sent"""
+        await self.reload()
+        rules = self.rules
+        if not len(rules):
+            return 0
+        snapshots = await self.dex_service.fetch_pairs(rules.addresses, PRIORITY_BACKGROUND)
+        current, fired = evaluate_rules(rules, value_matrix(rules.addresses, snapshots))
+
+        by_channel: Dict[int, List[str]] = defaultdict(list)
+        done_alerts: List[int] = []
+        references: List[Tuple[Optional[float], int]] = []
+        for i in np.flatnonzero(fired):
+            subscription = rules.subscriptions[i]
+            by_channel[subscription.channel_id].append(format_notification(subscription, float(current[i])))
+            ALERTS_FIRED.inc(subscription.kind)
+            if subscription.kind == KIND_ALERT:
+                done_alerts.append(subscription.id)
+            else:
+                # Re-arm at the new value; a zero clears the reference until a usable value shows up
+                references.append((float(current[i]) or None, subscription.id))
+        # Watches start from the first usable value; a zero price cannot anchor a percentage move
+        unusable = ~np.isfinite(rules.references) | (rules.references == 0)
+        unset = (rules.ops == _OP_CODES[OP_MOVE]) & unusable & np.isfinite(current) & (current != 0)
+        references.extend((float(current[i]), rules.subscriptions[i].id) for i in np.flatnonzero(unset))
+
+        # Persist first so a failed send cannot make an alert fire twice
+        if done_alerts:
+            await self.store.remove(done_alerts)
+        if references:
+            await self.store.set_references(references)
+
+        sent = 0
+        for channel_id, lines in by_channel.items():
+            for message in split_digest(lines, MAX_MESSAGE_LENGTH):
+                try:
+                    await self.send(channel_id, message)
+                    sent += 1
+                except Exception as e:
+                    logger.warning("alert delivery to channel %s failed: %r", channel_id, e)
+        return sent
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error("alert poll failed: %r", e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+from services.ratelimit import PRIORITY_INTERACTIVE
+
+class MicroBatcher:
+    """Collects keys submitted within a short window into one bulk call.
+
+    fetch_many(keys, priority) must return a mapping of key -> result; keys
+    missing from the mapping resolve to None. A batch is sent when the window
+    closes or as soon as max_batch distinct keys are waiting, at the most
+    urgent (lowest) priority of its members. Duplicate keys in one window
+    share the same result.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[Hashable], int], Awaitable[Dict[Hashable, Any]]],
+        window: float = 0.025,
+        max_batch: int = 30,
+        name: str = "batcher",
+    ):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self.name = name
+        self._pending: Dict[Hashable, List[asyncio.Future]] = {}
+        self._priority: Optional[int] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.submitted = 0
+        self.batches = 0
+
+    async def submit(self, key: Hashable, priority: int = PRIORITY_INTERACTIVE) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        self._priority = priority if self._priority is None else min(self._priority, priority)
+        self.submitted += 1
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'submitted': self.submitted,
+            'batches': self.batches,
+            'avg_batch': self.submitted / self.batches if self.batches else 0.0,
+            'waiting': len(self._pending),
+        }
+
+    async def close(self):
+        """Send whatever is waiting and wait for in-flight batches"""
+        if self._pending:
+            self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        priority, self._priority = self._priority, None
+        if not batch:
+            return
+        self.batches += 1
+        task = asyncio.ensure_future(self._run(batch, priority))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, List[asyncio.Future]], priority: int):
+        try:
+            results = await self.fetch_many(list(batch), priority)
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for key, futures in batch.items():
+            result = results.get(key)
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
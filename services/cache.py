@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+class AsyncTTLCache:
+    """Bounded LRU cache with per-entry TTL and single-flight loading.
+
+    Concurrent get_or_fetch() calls for the same key share one in-flight
+    fetch; callers that give up (e.g. hit a deadline) do not cancel it for
+    the others.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value without touching the counters"""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        cache_none: bool = False,
+    ) -> Any:
+        """Return the cached value or load it once for all concurrent callers"""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, fetch, ttl, cache_none))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._load_done(k, t))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+            'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: Optional[float], cache_none: bool) -> Any:
+        value = await fetch()
+        if value is not None or cache_none:
+            self.set(key, value, ttl)
+        return value
+
+    def _load_done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter already gave up
+        if not task.cancelled():
+            task.exception()
@@ -1,68 +1,210 @@
 import aiohttp
-import re
-from typing import Optional, Dict, Any
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+from services.batcher import MicroBatcher
+from services.cache import AsyncTTLCache
+from services.pairs import FAMILY_SOLANA, PairSnapshot, address_key, classify_address, select_best_pairs
+from services.ratelimit import PRIORITY_INTERACTIVE, HostScheduler, scheduled_get_json
+
+logger = logging.getLogger(__name__)
 
 class DexScreenerService:
     BASE_URL = "https://api.dexscreener.com"
+    RUGCHECK_URL = "https://api.rugcheck.xyz"
+    # latest/dex/tokens accepts at most this many comma-separated addresses
+    MAX_ADDRESSES_PER_REQUEST = 30
+
+    def __init__(
+        self,
+        limit_per_host: int = 20,
+        total_timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        cache_size: int = 2048,
+        pair_ttl: float = 15.0,
+        rugcheck_ttl: float = 600.0,
+        creator_ttl: float = 86400.0,
+        negative_ttl: float = 120.0,
+        batch_window: float = 0.025,
+        scheduler: Optional[HostScheduler] = None,
+        max_retries: int = 3,
+    ):
+        # Tuning for the shared connection pool; the session itself is created
+        # in start() because aiohttp wants it built inside the running loop
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout)
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Market data goes stale within seconds, rugcheck reports barely change
+        self.pair_cache = AsyncTTLCache(maxsize=cache_size, ttl=pair_ttl, name="pair_info")
+        self.rugcheck_cache = AsyncTTLCache(maxsize=cache_size, ttl=rugcheck_ttl, name="rugcheck")
+        # A token's deployer never changes; the full report behind it is large, so fetch it rarely
+        self.creator_cache = AsyncTTLCache(maxsize=cache_size, ttl=creator_ttl, name="creator")
+        # Addresses upstream says do not exist are cached as None for this long, so
+        # repeated typos and dead tokens are answered locally
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        # Per-host token buckets shared by every request this service makes
+        self.scheduler = scheduler or HostScheduler()
+        self.max_retries = max_retries
+        # Pair lookups arriving within batch_window share one multi-address request
+        self.pair_batcher = MicroBatcher(
+            self._fetch_pairs, window=batch_window, max_batch=self.MAX_ADDRESSES_PER_REQUEST, name="pair_info"
+        )
+
+    async def start(self):
+        # Open the shared session (one connector = pooled keep-alive connections)
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        # Close the shared session and release pooled connections
+        await self.pair_batcher.close()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("DexScreenerService.start() must be awaited before making requests")
+        return self._session
 
     @staticmethod
     def is_valid_pair_id(token_address: str) -> bool:
-        # Validate if the pair ID is valid (44 chars, alphanumeric)
-        if len(token_address) < 42:
-            return False
-        return bool(re.match("^[a-zA-Z0-9]*$", token_address))
-    
-    @staticmethod
-    async def fetch_pair_info(token_address: str) -> Optional[Dict[str, Any]]:
-        # Fetch pair information from DexScreener API
-        url = f"{DexScreenerService.BASE_URL}/latest/dex/tokens/{token_address}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data and data.get("pairs") and len(data["pairs"]) > 0:
-                        return data["pairs"][0]
-                return None
-    
-    @staticmethod
-    async def fetch_rugcheck(token_address: str) -> Optional[Dict[str, Any]]:
-        # Fetch pair information from DexScreener API
-        url = f"https://api.rugcheck.xyz/v1/tokens/{token_address}/report/summary"
-        print(url)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                print(response.status)
-                if response.status == 200:
-                    data = await response.json()
-                    print(data)
-                    if data:
-                        return data
-                return None
-    
-    @staticmethod
-    async def fetch_(token_address: str) -> Optional[Dict[str, Any]]:
+        # Solana base58 (32-byte key) or EVM 0x + 40 hex; anything else cannot exist upstream
+        return classify_address(token_address) is not None
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {cache.name: cache.stats() for cache in (self.pair_cache, self.rugcheck_cache, self.creator_cache)}
+
+    def _cached_negative(self, cache: AsyncTTLCache, key: str) -> bool:
+        # A stored None is a remembered "not found"; get() returns the default for absent keys
+        if cache.get(key, default=False) is None:
+            self.negative_hits += 1
+            return True
+        return False
+
+    async def _get_json(self, url: str, priority: int = PRIORITY_INTERACTIVE) -> Tuple[int, Any]:
+        # Rate-limited GET; retries 429/503 with Retry-After or jittered backoff
+        return await scheduled_get_json(self.session, self.scheduler, url, priority, self.max_retries)
+
+    async def fetch_pair_info(self, token_address: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[PairSnapshot]:
+        # Cached, single-flight, micro-batched DexScreener lookup
+        key = address_key(token_address)
+        if classify_address(key) is None or self._cached_negative(self.pair_cache, key):
+            return None
+        return await self.pair_cache.get_or_fetch(key, lambda: self.pair_batcher.submit(key, priority))
+
+    async def fetch_pairs(self, token_addresses: List[str], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Optional[PairSnapshot]]:
+        # Look up several tokens at once; the batcher folds them into as few requests as possible.
+        # A failed batch (e.g. rate limited) maps its tokens to None instead of failing the whole call
+        results = await asyncio.gather(
+            *(self.fetch_pair_info(address, priority) for address in token_addresses), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            logger.warning("%d of %d pair lookups failed: %r", len(errors), len(token_addresses), errors[0])
+        return {
+            address: None if isinstance(result, Exception) else result
+            for address, result in zip(token_addresses, results)
+        }
+
+    async def _fetch_pairs(self, keys: List[str], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, PairSnapshot]:
+        # Fetch pair information for up to MAX_ADDRESSES_PER_REQUEST tokens from DexScreener API
+        url = f"{self.BASE_URL}/latest/dex/tokens/{','.join(keys)}"
+        status, data = await self._get_json(url, priority)
+        if status == 404:
+            for key in keys:
+                self.pair_cache.set(key, None, ttl=self.negative_ttl)
+            return {}
+        if status != 200:
+            return {}
+        # Most liquid pool per token; the cache keeps only these compact snapshots
+        best = select_best_pairs((data or {}).get("pairs"), set(keys))
+        missing = [key for key in keys if key not in best]
+        if len(keys) == 1:
+            # An empty answer to a single-address request is a definite "not found"
+            for key in missing:
+                self.pair_cache.set(key, None, ttl=self.negative_ttl)
+        elif missing:
+            # Multi-address responses cap the pairs list, so absence proves nothing:
+            # ask for each missing address on its own
+            singles = await asyncio.gather(
+                *(self._fetch_pairs([key], priority) for key in missing), return_exceptions=True
+            )
+            for single in singles:
+                if isinstance(single, dict):
+                    best.update(single)
+        return best
+
+    async def fetch_rugcheck(self, token_address: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        # Cached, single-flight wrapper around the rugcheck lookup; rugcheck.xyz only covers Solana
+        if classify_address(token_address) != FAMILY_SOLANA or self._cached_negative(self.rugcheck_cache, token_address):
+            return None
+        return await self.rugcheck_cache.get_or_fetch(token_address, lambda: self._fetch_rugcheck(token_address, priority))
+
+    async def _fetch_rugcheck(self, token_address: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict[str, Any]]:
+        # Fetch the token report summary from rugcheck
+        url = f"{self.RUGCHECK_URL}/v1/tokens/{token_address}/report/summary"
+        status, data = await self._get_json(url, priority)
+        if status == 200 and data:
+            return data
+        if status == 404:
+            self.rugcheck_cache.set(token_address, None, ttl=self.negative_ttl)
+            return None
+        logger.warning("rugcheck returned HTTP %s for %s", status, token_address)
+        return None
+
+    async def fetch_creator(self, token_address: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
+        # Cached, single-flight deployer lookup; the report summary does not include the creator
+        if classify_address(token_address) != FAMILY_SOLANA or self._cached_negative(self.creator_cache, token_address):
+            return None
+        return await self.creator_cache.get_or_fetch(token_address, lambda: self._fetch_creator(token_address, priority))
+
+    async def _fetch_creator(self, token_address: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
+        # Fetch the full token report from rugcheck and keep only its creator field
+        url = f"{self.RUGCHECK_URL}/v1/tokens/{token_address}/report"
+        status, data = await self._get_json(url, priority)
+        if status == 200 and data:
+            return data.get('creator')
+        if status == 404:
+            self.creator_cache.set(token_address, None, ttl=self.negative_ttl)
+            return None
+        logger.warning("rugcheck report returned HTTP %s for %s", status, token_address)
+        return None
+
+    async def fetch_(self, token_address: str) -> Optional[Dict[str, Any]]:
         # Fetch pair information from DexScreener API
-        url = f"https://api.rugcheck.xyz/v1/tokens/{token_address}/report/summary"
-        print(url)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                print(response.status)
-                if response.status == 200:
-                    data = await response.json()
-                    print(data)
-                    if data:
-                        return data
-                return None
+        url = f"{self.RUGCHECK_URL}/v1/tokens/{token_address}/report/summary"
+        status, data = await self._get_json(url)
+        if status == 200 and data:
+            return data
+        logger.warning("rugcheck returned HTTP %s for %s", status, token_address)
+        return None
 
-    @staticmethod
-    async def fetch_first_token_url() -> Optional[str]:
+    async def fetch_latest_token_profiles(self, priority: int = PRIORITY_INTERACTIVE) -> Optional[List[Dict[str, Any]]]:
+        # Fetches the latest token profiles from DexScreener API
+        # Returns: list of profiles (newest first) or None on error
+        url = f"{self.BASE_URL}/token-profiles/latest/v1"
+        status, data = await self._get_json(url, priority)
+        if status == 200 and isinstance(data, list):
+            return data
+        return None
+
+    async def fetch_first_token_url(self, priority: int = PRIORITY_INTERACTIVE) -> Optional[str]:
         # Fetches the first token profile URL from DexScreener API
         # Returns: URL string or None if not found/error
-        async with aiohttp.ClientSession() as session:
-            url = f"{DexScreenerService.BASE_URL}/token-profiles/latest/v1"
-            async with session.get(DexScreenerService.BASE_URL) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data and len(data) > 0:
-                        return data[0].get('url')
-                return None
\ No newline at end of file
+        profiles = await self.fetch_latest_token_profiles(priority)
+        if profiles:
+            return profiles[0].get('url')
+        return None
@@ -0,0 +1,73 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+import orjson
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus exc for exceptions"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+class RateLimitFilter(logging.Filter):
+    """Lets each log call site through at most once per interval.
+
+    Records are keyed by logger, level and source line, so one call logging
+    different addresses (f-string or %-style) counts as one source. The next
+    record that passes reports how many were suppressed meanwhile. Only the
+    max_keys most recently seen call sites are tracked. Records above
+    max_level (by default warnings and errors) always pass: each one may
+    name a different token and none may be lost.
+    """
+
+    def __init__(self, interval: float = 10.0, max_keys: int = 1024, max_level: int = logging.INFO):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self.max_level = max_level
+        self._last: "OrderedDict[Tuple[str, int, str, int], Tuple[float, int]]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        last, suppressed = self._last.get(key, (0.0, 0))
+        if now - last < self.interval:
+            self._last[key] = (last, suppressed + 1)
+            self._last.move_to_end(key)
+            return False
+        self._last[key] = (now, 0)
+        self._last.move_to_end(key)
+        if len(self._last) > self.max_keys:
+            self._last.popitem(last=False)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+def json_logging() -> bool:
+    """Whether the root logger writes JSON lines, so worker processes can match it"""
+    return any(isinstance(handler.formatter, JsonFormatter) for handler in logging.getLogger().handlers)
+
+def setup_logging(level: Union[int, str] = logging.INFO, interval: float = 10.0, filename: Optional[str] = None,
+                  json_output: bool = False):
+    """Root logging for the bot processes: one handler, rate-limited per call site, text or JSON lines"""
+    handler = logging.FileHandler(filename) if filename else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RateLimitFilter(interval))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    # discord.py logs every gateway event at DEBUG/INFO; keep it to warnings
+    logging.getLogger("discord").setLevel(logging.WARNING)
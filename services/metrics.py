@@ -0,0 +1,213 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from aiohttp import web
+
+# Seconds; covers cache hits (sub-millisecond) up to slow upstream timeouts
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: Any, amount: float = 1.0):
+        key = tuple(str(value) for value in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+class _HistogramSeries:
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within buckets"""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: Any):
+        key = tuple(str(label) for label in label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, *label_values: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def series(self) -> Dict[LabelValues, Tuple[List[int], float, int]]:
+        with self._lock:
+            return {key: (list(s.counts), s.sum, s.count) for key, s in self._series.items()}
+
+    def quantile(self, q: float, *label_values: Any) -> Optional[float]:
+        key = tuple(str(label) for label in label_values)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or not series.count:
+                return None
+            counts = list(series.counts)
+            total = series.count
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # Overflow bucket has no upper bound; report its lower edge
+                    return lower
+                return lower + (self.buckets[index] - lower) * ((rank - seen) / count)
+            seen += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.series().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+class Gauge:
+    """Value read from a callback at scrape time (queue depths, cache sizes, ...).
+
+    The callback returns a number, or a mapping of label-value tuples to numbers.
+    """
+
+    def __init__(self, name: str, help: str, read: Callable[[], Any], labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labels = tuple(labels)
+
+    def values(self) -> Dict[LabelValues, float]:
+        try:
+            value = self.read()
+        except Exception:
+            return {}
+        if isinstance(value, dict):
+            return {tuple(str(label) for label in key): float(v) for key, v in value.items()}
+        return {(): float(value)}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics for one process; get-or-create so modules can share a metric by name"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], Any], labels: Sequence[str] = ()) -> Gauge:
+        # Re-registering replaces the callback (e.g. a new client instance)
+        with self._lock:
+            gauge = self._metrics[name] = Gauge(name, help, read, labels)
+            return gauge
+
+    def get(self, name: str) -> Optional[Any]:
+        return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the bot and its services
+REGISTRY = MetricsRegistry()
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "ponderbot_command_seconds", "Slash command handling time", ("command", "outcome"),
+)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "ponderbot_upstream_request_seconds", "Upstream HTTP request time, per attempt", ("host",),
+)
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    "ponderbot_upstream_responses_total", "Upstream HTTP responses by status (error = no response)", ("host", "status"),
+)
+
+class MetricsServer:
+    """Serves the registry as Prometheus text on GET /metrics"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render_prometheus(), content_type="text/plain", charset="utf-8")
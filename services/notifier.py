@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from services.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+def split_digest(lines: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Join lines into as few messages as fit under the length limit"""
+    messages, current = [], ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            messages.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        messages.append(current)
+    return messages
+
+class _ChatLane:
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.priority: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.info: Deque[str] = deque()
+        self.pending_digest: List[str] = []
+        self.digest_timer: Optional[asyncio.TimerHandle] = None
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+class NotificationQueue:
+    """Outbound message queue with per-chat rate limits and digest coalescing.
+
+    send_priority() messages (trade commands) go out one by one, ahead of
+    anything informational for the same chat. notify() messages are
+    collected for digest_window seconds and sent as one digest. Each chat
+    gets its own worker and token bucket, plus a global bucket for the bot
+    as a whole, so one slow chat never holds up another.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any, str], Awaitable[Any]],
+        per_chat_rate: float = 1.0,
+        per_chat_burst: int = 3,
+        global_rate: float = 25.0,
+        digest_window: float = 5.0,
+        max_retries: int = 3,
+        retry_after: Optional[Callable[[Exception], Optional[float]]] = None,
+    ):
+        self.send = send
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_bucket = TokenBucket(global_rate, int(global_rate))
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        # Extracts a server-requested delay (e.g. Telegram's RetryAfter) from a send error
+        self.retry_after = retry_after or (lambda error: None)
+        self._lanes: Dict[Any, _ChatLane] = {}
+        self._closing = False
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def send_priority(self, chat_id: Any, text: str) -> asyncio.Future:
+        """Queue a message that must not wait behind informational traffic.
+
+        The returned future resolves to True once the message is delivered,
+        or False if sending failed; awaiting it is optional.
+        """
+        lane = self._lane(chat_id)
+        delivered = asyncio.get_running_loop().create_future()
+        lane.priority.append((text, delivered))
+        lane.wakeup.set()
+        return delivered
+
+    def notify(self, chat_id: Any, text: str):
+        """Queue an informational message; it will be merged into the next digest"""
+        lane = self._lane(chat_id)
+        lane.pending_digest.append(text)
+        if lane.digest_timer is None:
+            lane.digest_timer = asyncio.get_running_loop().call_later(self.digest_window, self._flush_digest, chat_id)
+
+    def queue_depth(self) -> int:
+        return sum(len(lane.priority) + len(lane.info) + len(lane.pending_digest) for lane in self._lanes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'chats': len(self._lanes),
+            'queued': self.queue_depth(),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+        }
+
+    async def close(self, timeout: float = 10.0):
+        """Flush pending digests and wait (up to timeout) for every lane to drain"""
+        self._closing = True
+        for chat_id in list(self._lanes):
+            self._flush_digest(chat_id)
+        workers = [lane.worker for lane in self._lanes.values() if lane.worker is not None]
+        for lane in self._lanes.values():
+            lane.wakeup.set()
+        if workers:
+            done, pending = await asyncio.wait(workers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+
+    def _lane(self, chat_id: Any) -> _ChatLane:
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _ChatLane(self.per_chat_rate, self.per_chat_burst)
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.create_task(self._run(chat_id, lane))
+        return lane
+
+    def _flush_digest(self, chat_id: Any):
+        lane = self._lanes[chat_id]
+        if lane.digest_timer is not None:
+            lane.digest_timer.cancel()
+            lane.digest_timer = None
+        if not lane.pending_digest:
+            return
+        lines, lane.pending_digest = lane.pending_digest, []
+        messages = split_digest(lines)
+        self.coalesced += len(lines) - len(messages)
+        lane.info.extend(messages)
+        lane.wakeup.set()
+
+    async def _run(self, chat_id: Any, lane: _ChatLane):
+        while True:
+            if not lane.priority and not lane.info:
+                if self._closing:
+                    return
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+            await self._wait_for_slot(lane)
+            # Re-check after waiting: a trade command may have arrived meanwhile
+            if lane.priority:
+                text, delivered = lane.priority.popleft()
+                ok = await self._deliver(chat_id, lane, text)
+                if not delivered.done():
+                    delivered.set_result(ok)
+            else:
+                await self._deliver(chat_id, lane, lane.info.popleft())
+
+    async def _wait_for_slot(self, lane: _ChatLane):
+        for bucket in (lane.bucket, self.global_bucket):
+            delay = bucket.reserve()
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = bucket.reserve()
+
+    async def _deliver(self, chat_id: Any, lane: _ChatLane, text: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.send(chat_id, text)
+                self.sent += 1
+                return True
+            except Exception as e:
+                delay = self.retry_after(e)
+                if delay is None or attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error("Error sending message to chat %s: %s", chat_id, e)
+                    return False
+                # Flood control: pause this chat and retry the same message
+                lane.bucket.pause(delay)
+                await self._wait_for_slot(lane)
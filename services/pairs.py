@@ -0,0 +1,110 @@
+import re
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+FAMILY_SOLANA = "solana"
+FAMILY_EVM = "evm"
+
+_EVM_ADDRESS = re.compile(r"0[xX][0-9a-fA-F]{40}")
+# Base58 has no 0, O, I or l; a 32-byte key encodes to 32-44 characters
+_SOLANA_ADDRESS = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+_BASE58_VALUES = {char: value for value, char in enumerate("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz")}
+
+def _base58_is_32_bytes(text: str) -> bool:
+    # Leading '1's are zero bytes; the rest is a big-endian base58 number
+    zeros = len(text) - len(text.lstrip("1"))
+    value = 0
+    for char in text[zeros:]:
+        value = value * 58 + _BASE58_VALUES[char]
+    return zeros + (value.bit_length() + 7) // 8 == 32
+
+def classify_address(token_address: str) -> Optional[str]:
+    """FAMILY_EVM for 0x + 40 hex digits, FAMILY_SOLANA for base58 that decodes to 32 bytes, else None"""
+    if _EVM_ADDRESS.fullmatch(token_address):
+        return FAMILY_EVM
+    if _SOLANA_ADDRESS.fullmatch(token_address) and _base58_is_32_bytes(token_address):
+        return FAMILY_SOLANA
+    return None
+
+def address_key(token_address: str) -> str:
+    # EVM addresses are case-insensitive hex, Solana base58 is case-sensitive
+    if token_address[:2].lower() == "0x":
+        return token_address.lower()
+    return token_address
+
+def _float(value: Any) -> Optional[float]:
+    # DexScreener sends prices as strings and sizes as numbers; either may be missing
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class PairSnapshot:
+    """The fields we use from one DexScreener pair, without the nested response dicts"""
+
+    __slots__ = (
+        'chain_id', 'dex_id', 'url', 'pair_address',
+        'base_address', 'base_name', 'base_symbol',
+        'quote_address', 'quote_name', 'quote_symbol',
+        'price_usd', 'price_change_h24', 'volume_h24', 'liquidity_usd',
+        'market_cap', 'fdv', 'pair_created_at',
+    )
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, pair: Dict[str, Any]) -> "PairSnapshot":
+        base = pair.get('baseToken') or {}
+        quote = pair.get('quoteToken') or {}
+        return cls(
+            chain_id=pair.get('chainId'),
+            dex_id=pair.get('dexId'),
+            url=pair.get('url'),
+            pair_address=pair.get('pairAddress'),
+            base_address=base.get('address'),
+            base_name=base.get('name'),
+            base_symbol=base.get('symbol'),
+            quote_address=quote.get('address'),
+            quote_name=quote.get('name'),
+            quote_symbol=quote.get('symbol'),
+            price_usd=_float(pair.get('priceUsd')),
+            price_change_h24=_float((pair.get('priceChange') or {}).get('h24')),
+            volume_h24=_float((pair.get('volume') or {}).get('h24')),
+            liquidity_usd=_float((pair.get('liquidity') or {}).get('usd')),
+            market_cap=_float(pair.get('marketCap')),
+            fdv=_float(pair.get('fdv')),
+            pair_created_at=pair.get('pairCreatedAt'),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"PairSnapshot({self.dex_id} {self.base_symbol}/{self.quote_symbol} {self.pair_address})"
+
+def _liquidity(pair: Dict[str, Any]) -> float:
+    return _float((pair.get('liquidity') or {}).get('usd')) or 0.0
+
+def select_best_pairs(pairs: Iterable[Dict[str, Any]], wanted: Set[str]) -> Dict[str, PairSnapshot]:
+    """Most liquid pair per wanted token address, in one pass over the response.
+
+    A pair where the token is the base token always beats one where it is
+    only the quote token. Only the winners are turned into snapshots.
+    """
+    # key -> (is_base, liquidity, pair)
+    best: Dict[str, Tuple[bool, float, Dict[str, Any]]] = {}
+    for pair in pairs or []:
+        liquidity = None
+        for side, is_base in (('baseToken', True), ('quoteToken', False)):
+            key = address_key((pair.get(side) or {}).get('address') or "")
+            if key not in wanted:
+                continue
+            if liquidity is None:
+                liquidity = _liquidity(pair)
+            current = best.get(key)
+            if current is None or (is_base, liquidity) > (current[0], current[1]):
+                best[key] = (is_base, liquidity, pair)
+    return {key: PairSnapshot.from_dict(pair) for key, (_, _, pair) in best.items()}
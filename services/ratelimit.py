@@ -0,0 +1,241 @@
+import aiohttp
+import asyncio
+import email.utils
+import heapq
+import itertools
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from services.metrics import UPSTREAM_LATENCY, UPSTREAM_RESPONSES
+
+# orjson decodes large responses several times faster; stdlib json is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Requests per second and burst size per upstream host
+DEFAULT_HOST_LIMITS: Dict[str, Tuple[float, int]] = {
+    "api.dexscreener.com": (5.0, 10),   # 300 requests/minute
+    "api.rugcheck.xyz": (3.0, 6),
+}
+DEFAULT_LIMIT = (5.0, 10)
+
+def split_limit(limit: Tuple[float, int], parts: int) -> Tuple[float, int]:
+    """One part of a (rate, burst) budget; the burst never drops below one request"""
+    rate, capacity = limit
+    parts = max(1, parts)
+    return rate / parts, max(1, capacity // parts)
+
+class RateLimitedError(Exception):
+    """Raised when an upstream keeps answering 429 after all retries"""
+
+    def __init__(self, host: str, retry_after: Optional[float] = None):
+        super().__init__(f"{host} is rate limiting requests")
+        self.host = host
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket that never sleeps itself; callers wait the returned delay.
+
+    Works the same from asyncio code and from plain threads.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Take a token and return 0, or return how long to wait before trying again"""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (upstream said 429)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+def loads(body: bytes) -> Any:
+    """Decode a JSON response body straight from bytes"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After may be delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = 0.5, cap: float = 30.0) -> float:
+    """Delay before retry number `attempt` (0-based), honoring Retry-After when given"""
+    if retry_after is not None:
+        # Small jitter so every waiter does not come back in the same instant
+        return min(cap, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class _HostQueue:
+    def __init__(self, rate: float, capacity: int):
+        self.bucket = TokenBucket(rate, capacity)
+        self.waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.granted = 0
+        self.throttled = 0
+        self.wait_total: Dict[int, float] = {}
+        self.wait_max: Dict[int, float] = {}
+        self.wait_count: Dict[int, int] = {}
+
+class HostScheduler:
+    """Per-host token buckets with priority queues.
+
+    acquire() returns once a request to that host may be sent. Waiters are
+    served lowest priority value first, FIFO within a class, so interactive
+    lookups overtake queued background scans. penalize() pauses a host after
+    a 429. Buckets live in one process; when `processes` schedulers share an
+    upstream budget (e.g. shard workers), each gets 1/processes of every
+    host's rate and burst.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, int]]] = None, default: Tuple[float, int] = DEFAULT_LIMIT,
+                 processes: int = 1):
+        limits = DEFAULT_HOST_LIMITS if limits is None else limits
+        self.limits = {host: split_limit(limit, processes) for host, limit in limits.items()}
+        self.default = split_limit(default, processes)
+        self._hosts: Dict[str, _HostQueue] = {}
+        self._seq = itertools.count()
+
+    def _host(self, host: str) -> _HostQueue:
+        state = self._hosts.get(host)
+        if state is None:
+            rate, capacity = self.limits.get(host, self.default)
+            state = self._hosts[host] = _HostQueue(rate, capacity)
+        return state
+
+    async def acquire(self, host: str, priority: int = PRIORITY_INTERACTIVE):
+        state = self._host(host)
+        # Fast path: nobody queued and a token is available
+        if not state.waiters and state.bucket.reserve() == 0.0:
+            self._record(state, priority, 0.0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(state.waiters, (priority, next(self._seq), time.monotonic(), future))
+        if state.dispatcher is None or state.dispatcher.done():
+            state.dispatcher = asyncio.create_task(self._dispatch(state))
+        await future
+
+    def penalize(self, host: str, seconds: float):
+        state = self._host(host)
+        state.bucket.pause(seconds)
+        state.throttled += 1
+
+    def queue_depth(self, host: Optional[str] = None) -> int:
+        if host is not None:
+            return len(self._hosts[host].waiters) if host in self._hosts else 0
+        return sum(len(state.waiters) for state in self._hosts.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for host, state in self._hosts.items():
+            waits = {}
+            for priority, count in state.wait_count.items():
+                waits[PRIORITY_NAMES.get(priority, str(priority))] = {
+                    'count': count,
+                    'avg_wait': state.wait_total[priority] / count,
+                    'max_wait': state.wait_max[priority],
+                }
+            result[host] = {
+                'queue_depth': len(state.waiters),
+                'granted': state.granted,
+                'throttled': state.throttled,
+                'waits': waits,
+            }
+        return result
+
+    def _record(self, state: _HostQueue, priority: int, waited: float):
+        state.granted += 1
+        state.wait_count[priority] = state.wait_count.get(priority, 0) + 1
+        state.wait_total[priority] = state.wait_total.get(priority, 0.0) + waited
+        state.wait_max[priority] = max(state.wait_max.get(priority, 0.0), waited)
+
+    async def _dispatch(self, state: _HostQueue):
+        while state.waiters:
+            # Drop waiters that gave up (deadline hit) before spending a token on them
+            if state.waiters[0][3].done():
+                heapq.heappop(state.waiters)
+                continue
+            delay = state.bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            priority, _, enqueued, future = heapq.heappop(state.waiters)
+            if future.done():
+                # Cancelled while we were waiting; give the token back
+                state.bucket.tokens += 1.0
+                continue
+            self._record(state, priority, time.monotonic() - enqueued)
+            future.set_result(None)
+
+async def scheduled_get_json(
+    session: aiohttp.ClientSession,
+    scheduler: HostScheduler,
+    url: str,
+    priority: int = PRIORITY_INTERACTIVE,
+    max_retries: int = 3,
+    **kwargs: Any,
+) -> Tuple[int, Any]:
+    """GET through the scheduler, returning (status, decoded JSON or None).
+
+    429/503 responses pause the whole host for Retry-After (or a jittered
+    backoff) and are retried; RateLimitedError is raised once retries run out.
+    """
+    host = urlsplit(url).hostname
+    retry_after = None
+    for attempt in range(max_retries + 1):
+        await scheduler.acquire(host, priority)
+        started = time.perf_counter()
+        try:
+            async with session.get(url, **kwargs) as response:
+                UPSTREAM_RESPONSES.inc(host, response.status)
+                if response.status not in (429, 503):
+                    data = None
+                    if response.status == 200:
+                        body = await response.read()
+                        data = loads(body) if body.strip() else None
+                    return response.status, data
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            UPSTREAM_RESPONSES.inc(host, "error")
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started, host)
+        scheduler.penalize(host, backoff_delay(attempt, retry_after))
+    raise RateLimitedError(host, retry_after)
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+from db.blacklist import BlacklistStore
+from services.dexscreener import DexScreenerService
+from services.logs import json_logging, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Restart backoff for the supervised scanner task, in seconds
+INITIAL_RESTART_DELAY = 5.0
+MAX_RESTART_DELAY = 300.0
+# A run lasting this long resets the backoff
+HEALTHY_UPTIME = 300.0
+
+class ScannerService:
+    """Runs the services.test scanner as a supervised task on the bot's event loop.
+
+    The scanner shares the bot's DexScreenerService (session, rate limits,
+    pair cache and batcher) and blacklist, so /check and the scanner never
+    fetch the same pair twice. analyze_data() runs in a one-worker process
+    pool instead of on the loop. If the watcher or analytics loop crashes
+    it is restarted with exponential backoff; Telegram queues and the
+    trade dispatcher stay up across restarts.
+    """
+
+    def __init__(
+        self,
+        dex_service: DexScreenerService,
+        blacklist: BlacklistStore,
+        config_path: Optional[str] = "config.yaml",
+        analysis_workers: int = 1,
+    ):
+        self.dex_service = dex_service
+        self.blacklist = blacklist
+        self.config_path = config_path
+        self.analysis_workers = analysis_workers
+        self.scanner = None
+        self.config: Optional[Dict[str, Any]] = None
+        self.watcher = None
+        self._outbound_started = False
+        self.restarts = 0
+        self.last_analysis: Optional[Dict[str, Any]] = None
+        self.last_analysis_at: Optional[float] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        """Start the supervised task; returns False (scanner disabled) without a config file"""
+        if self.running:
+            return True
+        if not self.config_path or not os.path.exists(self.config_path):
+            logger.info("Scanner disabled: no config at %r", self.config_path)
+            return False
+        try:
+            # Imported here: pandas and SQLAlchemy only load when the scanner actually runs
+            from services import test as scanner
+            self.config = scanner.setup(self.config_path, blacklist_store=self.blacklist)
+        except Exception as e:
+            # A missing scanner dependency or a broken config must not take the Discord bot down with it
+            logger.error("Scanner disabled: setup failed: %r", e)
+            return False
+        self.scanner = scanner
+        # One watcher for the service's lifetime: its seen-set must survive restarts,
+        # or the first poll after a crash would re-trade the whole profiles feed
+        self.watcher = scanner.make_watcher(self.dex_service, self.config)
+        self._task = asyncio.create_task(self._supervise())
+        return True
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.watcher.close()
+        if self._outbound_started:
+            await self.scanner.close_outbound()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self.scanner.engine.dispose()
+
+    def detections(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recently validated coins, newest first"""
+        if self.scanner is None:
+            return []
+        return list(reversed(self.scanner.recent_detections))[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        watcher = self.watcher
+        return {
+            'running': self.running,
+            'restarts': self.restarts,
+            'polls': watcher.polls if watcher else 0,
+            'new_tokens': watcher.new_tokens if watcher else 0,
+            'detections': len(self.scanner.recent_detections) if self.scanner else 0,
+        }
+
+    async def analyze(self) -> Optional[Dict[str, Any]]:
+        """Run analyze_data() in the process pool and keep its summary"""
+        if self._pool is None:
+            # spawn: never fork a process that owns database and event-loop threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.analysis_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=setup_logging,
+                initargs=(logging.getLogger().level, 10.0, None, json_logging()),
+            )
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._pool, self.scanner.run_analysis, self.scanner.DATABASE_URL)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); the next call starts a fresh pool
+            self._pool = None
+            raise
+        self.last_analysis = result
+        self.last_analysis_at = time.time()
+        return result
+
+    async def _run(self):
+        if not self._outbound_started:
+            # Telegram client and trade dispatcher are started once and outlive restarts
+            await self.scanner.start_outbound()
+            self._outbound_started = True
+        tasks = [asyncio.create_task(self.watcher.run()), asyncio.create_task(self._run_analytics())]
+        try:
+            # Neither loop returns; whichever fails first takes the other down with it
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_analytics(self):
+        interval = self.config.get('watcher', {}).get('analytics_interval', 3600)
+        while True:
+            await asyncio.sleep(interval)
+            await self.analyze()
+
+    async def _supervise(self):
+        delay = INITIAL_RESTART_DELAY
+        while True:
+            started = time.monotonic()
+            try:
+                await self._run()
+                return
+            except Exception as e:
+                logger.error("Scanner crashed: %r", e)
+            if time.monotonic() - started >= HEALTHY_UPTIME:
+                delay = INITIAL_RESTART_DELAY
+            self.restarts += 1
+            logger.warning("Restarting scanner in %.0fs (restart %d)", delay, self.restarts)
+            await asyncio.sleep(delay)
+            delay = min(MAX_RESTART_DELAY, delay * 2)
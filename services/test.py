@@ -1,28 +1,31 @@
-import requests
-from sqlalchemy import create_engine, Column, String, Float, DateTime
+import aiohttp
+import asyncio
+from collections import deque
+from sqlalchemy import create_engine, event, func, inspect, select, text, Column, String, Float, DateTime, Index, Integer
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
+import numpy as np
 import pandas as pd
-import schedule
-import time
 import logging
 import yaml
 import os
+import time
 import telegram
-from telegram.error import TelegramError
-
-# Setup logging
-logging.basicConfig(
-    filename='dexscreener_bot.log',
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s:%(message)s'
-)
+from telegram.error import RetryAfter
+from db.blacklist import KIND_COIN, KIND_DEV, REASON_BUNDLED, REASON_CONFIG, BlacklistStore
+from services.dexscreener import DexScreenerService
+from services.notifier import NotificationQueue
+from services.pairs import address_key
+from services.trade_dispatch import TradeDispatcher, TradeOrder
+from services.watcher import TokenProfileWatcher
+from services.ratelimit import PRIORITY_BACKGROUND, RateLimitedError, scheduled_get_json
 
 # Load configuration
 def load_config(config_path='config.yaml'):
     if not os.path.exists(config_path):
-        logging.error(f"Configuration file {config_path} not found.")
+        logging.error("Configuration file %s not found.", config_path)
         raise FileNotFoundError(f"Configuration file {config_path} not found.")
     with open(config_path, 'r') as file:
         try:
@@ -30,47 +33,184 @@ def load_config(config_path='config.yaml'):
             logging.info("Configuration loaded successfully.")
             return config
         except yaml.YAMLError as e:
-            logging.error(f"Error parsing config file: {e}")
+            logging.error("Error parsing config file: %s", e)
             raise
 
-config = load_config()
+# Module state, filled in by setup(); importing this module has no side effects
+config = None
+engine = None
+Session = None
+blacklist = None
+telegram_bot = None
+notifier = None
+trade_dispatcher = None
+
+# Most recent validated coins, newest last, for the bot's /detections command
+DETECTION_HISTORY = 200
+recent_detections = deque(maxlen=DETECTION_HISTORY)
 
 # Database setup
 Base = declarative_base()
 
 class CoinEvent(Base):
     __tablename__ = 'coin_events'
+    # One row per (token, detection time); the composite key doubles as the (id, timestamp) index
     id = Column(String, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.datetime.utcnow)
     name = Column(String)
     price = Column(Float)
     event_type = Column(String)
     dev_address = Column(String)
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
-engine = create_engine('sqlite:///coins.db')
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+    __table_args__ = (
+        Index('ix_coin_events_event_type', 'event_type'),
+        Index('ix_coin_events_timestamp', 'timestamp'),
+    )
+
+# Materialized analytics, maintained incrementally by analyze_data()
+class AnalyticsState(Base):
+    __tablename__ = 'analytics_state'
+    name = Column(String, primary_key=True)
+    # Highest coin_events rowid already folded into the summaries
+    watermark = Column(Integer, nullable=False, default=0)
+
+class EventTypeSummary(Base):
+    __tablename__ = 'event_type_summary'
+    event_type = Column(String, primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    price_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    price_sq_sum = Column(Float, nullable=False, default=0.0)
+    price_min = Column(Float)
+    price_max = Column(Float)
+
+class EventPeriodSummary(Base):
+    __tablename__ = 'event_period_summary'
+    # Hour bucket, formatted 'YYYY-MM-DD HH:00:00'
+    period_start = Column(String, primary_key=True)
+    event_type = Column(String, primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    price_count = Column(Integer, nullable=False, default=0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    price_min = Column(Float)
+    price_max = Column(Float)
+
+ANALYTICS_WATERMARK = 'coin_events'
+# Rows per chunk when a full rescan of coin_events is needed
+ANALYTICS_CHUNK_ROWS = 50_000
+
+# coin_events columns written by save_to_database
+SAVED_COLUMNS = ('id', 'timestamp', 'name', 'price', 'event_type', 'dev_address')
+# Rows per multi-row INSERT: each row binds one parameter per column, and
+# SQLite before 3.32 allows at most 999 bound parameters per statement
+SAVE_CHUNK_ROWS = 999 // len(SAVED_COLUMNS)
+
+def migrate_coin_events(engine):
+    """
+    Rebuilds a coin_events table created with `id` as its only primary key,
+    which made a second event for the same token collide.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table('coin_events'):
+        return
+    if inspector.get_pk_constraint('coin_events').get('constrained_columns') != ['id']:
+        return
+    logging.info("Migrating coin_events to the (id, timestamp) primary key.")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE coin_events RENAME TO coin_events_old"))
+        CoinEvent.__table__.create(conn)
+        conn.execute(text(
+            "INSERT OR IGNORE INTO coin_events (id, timestamp, name, price, event_type, dev_address) "
+            "SELECT id, timestamp, name, price, event_type, dev_address FROM coin_events_old"
+        ))
+        conn.execute(text("DROP TABLE coin_events_old"))
+
+DATABASE_URL = 'sqlite:///coins.db'
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute("PRAGMA busy_timeout = 5000")
+    cursor.close()
+
+def setup_database(database_url=DATABASE_URL):
+    """
+    Creates the coin_events engine and schema (also used by analysis worker processes).
+    """
+    global engine, Session
+    engine = create_engine(database_url)
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    migrate_coin_events(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    return engine
+
+def setup(config_path='config.yaml', blacklist_store=None):
+    """
+    Loads the configuration and builds the scanner's database, blacklist and
+    outbound queues. Pass blacklist_store to share an already open store
+    (the Discord bot does); otherwise the configured one is opened.
+    """
+    global config, blacklist, telegram_bot, notifier, trade_dispatcher
+    config = load_config(config_path)
+    setup_database()
+
+    # Persistent blacklist shared with the Discord bot; config lists seed it on startup
+    blacklist = blacklist_store or BlacklistStore(config.get('blacklist', {}).get('db_path', 'blacklist.db'))
+    blacklist.add_many(((KIND_COIN, value) for value in config.get('coin_blacklist') or []), REASON_CONFIG)
+    blacklist.add_many(((KIND_DEV, value) for value in config.get('dev_blacklist') or []), REASON_CONFIG)
+
+    # Initialize Telegram Bot
+    telegram_bot = telegram.Bot(token=config['telegram']['bot_token'])
+
+    # Outbound Telegram traffic: trade commands jump the queue, notifications are sent as digests
+    notifier = NotificationQueue(
+        telegram_send,
+        digest_window=config['telegram'].get('digest_window', 5),
+        retry_after=telegram_retry_after,
+    )
+
+    # Validated coins are handed to this queue; its worker sends the orders
+    trade_dispatcher = TradeDispatcher(
+        dispatch_trade,
+        report_every=config.get('trading', {}).get('latency_report_every', 20),
+    )
+    return config
 
 # Constants
 DEXSCREENER_API_URL = "https://api.dexscreener.com/latest/dex/tokens"
 
-# Initialize Telegram Bot
-telegram_bot = telegram.Bot(token=config['telegram']['bot_token'])
+async def telegram_send(chat_id, message):
+    await telegram_bot.send_message(chat_id=chat_id, text=message)
+
+def telegram_retry_after(error):
+    """
+    Seconds Telegram asked us to wait, or None for errors that must not be retried.
+    """
+    if isinstance(error, RetryAfter):
+        delay = error.retry_after
+        return delay.total_seconds() if isinstance(delay, datetime.timedelta) else float(delay)
+    return None
+
+# Default number of tokens validated against network APIs at the same time
+DEFAULT_MAX_CONCURRENCY = 16
 
 # Functions
 
-def fetch_coin_data():
+async def fetch_coin_data(session, scheduler):
     try:
-        response = requests.get(DEXSCREENER_API_URL)
-        response.raise_for_status()
-        data = response.json()
+        status, data = await scheduled_get_json(session, scheduler, DEXSCREENER_API_URL, PRIORITY_BACKGROUND)
+        if status != 200:
+            logging.error("Error fetching data: HTTP %s", status)
+            return None
         logging.info("Fetched coin data successfully.")
         return data
-    except requests.RequestException as e:
-        logging.error(f"Error fetching data: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError, RateLimitedError) as e:
+        logging.error("Error fetching data: %s", e)
         return None
 
-def is_token_good_rugcheck(token_id, config):
+async def is_token_good_rugcheck(token_id, config, session, scheduler):
     """
     Verifies if a token is marked as 'Good' on rugcheck.xyz.
     """
@@ -84,39 +224,37 @@ def is_token_good_rugcheck(token_id, config):
         url = f"{base_url}/{token_id}"
         headers = {'Authorization': f"Bearer {api_key}"}
 
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        status_code, result = await scheduled_get_json(session, scheduler, url, PRIORITY_BACKGROUND, headers=headers)
+        if status_code != 200:
+            logging.error("rugcheck.xyz API returned HTTP %s for token %s.", status_code, token_id)
+            return False
 
         # Assuming the API returns a 'status' field
         status = result.get('status', 'Unknown')
         if status == good_status:
             return True
         else:
-            logging.info(f"Token {token_id} is marked as '{status}' on rugcheck.xyz. Skipping.")
+            logging.info("Token %s is marked as '%s' on rugcheck.xyz. Skipping.", token_id, status)
             return False
-    except requests.RequestException as e:
-        logging.error(f"Error connecting to rugcheck.xyz API for token {token_id}: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError, RateLimitedError) as e:
+        logging.error("Error connecting to rugcheck.xyz API for token %s: %s", token_id, e)
         return False
     except Exception as e:
-        logging.error(f"Unexpected error during rugcheck.xyz verification for token {token_id}: {e}")
+        logging.error("Unexpected error during rugcheck.xyz verification for token %s: %s", token_id, e)
         return False
 
-def is_supply_bundled(token_data, config):
+def bundled_supply_mask(frame, config):
     """
-    Checks if a token's supply is bundled.
+    Flags tokens whose supply is bundled, for the whole frame at once.
     """
-    try:
-        # Assuming the API provides a field indicating if supply is bundled
-        # The field name is configurable
-        bundled_field = config['supply_check']['bundled_supply_field']
-        is_bundled = token_data.get(bundled_field, False)
-        return is_bundled
-    except Exception as e:
-        logging.error(f"Error checking supply bundling for token {token_data.get('id', 'Unknown')}: {e}")
-        return False
-
-def update_blacklists_if_bundled(token_data, config):
+    # Assuming the API provides a field indicating if supply is bundled
+    # The field name is configurable
+    bundled_field = config['supply_check']['bundled_supply_field']
+    if bundled_field not in frame:
+        return pd.Series(False, index=frame.index)
+    return frame[bundled_field].fillna(False).astype(bool)
+
+def update_blacklists_if_bundled(token_data, blacklist):
     """
     Updates the coin and developer blacklists if the token's supply is bundled.
     """
@@ -126,44 +264,25 @@ def update_blacklists_if_bundled(token_data, config):
         coin_name = token_data.get('name')
 
         if coin_id and dev_address:
-            # Update coin blacklist
-            config['coin_blacklist'].append(coin_id)
-            config['coin_blacklist'].append(coin_name)
-
-            # Update developer blacklist
-            config['dev_blacklist'].append(dev_address)
+            # Update coin and developer blacklists; bundled entries expire after a while
+            blacklist.add_many([(KIND_COIN, coin_id), (KIND_COIN, coin_name), (KIND_DEV, dev_address)], REASON_BUNDLED)
 
-            logging.info(f"Token {coin_name} ({coin_id}) has bundled supply. Added to blacklists.")
+            logging.info("Token %s (%s) has bundled supply. Added to blacklists.", coin_name, coin_id)
     except Exception as e:
-        logging.error(f"Error updating blacklists for token {token_data.get('id', 'Unknown')}: {e}")
+        logging.error("Error updating blacklists for token %s: %s", token_data.get('id', 'Unknown'), e)
 
-def is_volume_valid_algorithm(coin, config):
+def volume_mask_algorithm(frame, config):
     """
-    Validates the volume of a coin using algorithm-based checks.
+    Validates volume with the algorithm-based thresholds, for the whole frame at once.
     """
-    try:
-        # Extract volume data
-        daily_volume = float(coin.get('daily_volume', 0))  # Assuming 'daily_volume' is provided
-        volume_change = float(coin.get('volume_change_percentage_24h', 0))  # Assuming this field exists
-
-        # Apply minimum volume threshold
-        min_volume = config['fake_volume_detection']['algorithm']['min_volume_threshold']
-        if daily_volume < min_volume:
-            logging.info(f"Coin {coin.get('name')} ({coin.get('id')}) has volume {daily_volume} below threshold {min_volume}. Skipping.")
-            return False
-
-        # Apply maximum volume change percentage
-        max_volume_change = config['fake_volume_detection']['algorithm']['max_volume_change_percentage']
-        if abs(volume_change) > max_volume_change:
-            logging.info(f"Coin {coin.get('name')} ({coin.get('id')}) has volume change {volume_change}% beyond threshold {max_volume_change}%. Skipping.")
-            return False
+    algorithm = config['fake_volume_detection']['algorithm']
+    daily_volume = numeric_column(frame, 'daily_volume')  # Assuming 'daily_volume' is provided
+    volume_change = numeric_column(frame, 'volume_change_percentage_24h')  # Assuming this field exists
 
-        return True
-    except Exception as e:
-        logging.error(f"Error in algorithm-based volume validation for {coin.get('name', 'Unknown')}: {e}")
-        return False
+    # Minimum volume threshold and maximum volume change percentage
+    return (daily_volume >= algorithm['min_volume_threshold']) & (volume_change.abs() <= algorithm['max_volume_change_percentage'])
 
-def is_volume_valid_pocket_universe(coin, config):
+async def is_volume_valid_pocket_universe(coin, config, session, scheduler):
     """
     Validates the volume of a coin using the Pocket Universe API.
     """
@@ -176,35 +295,35 @@ def is_volume_valid_pocket_universe(coin, config):
         params = {'coin_id': coin.get('id')}
         headers = {'Authorization': f"Bearer {api_key}"}
 
-        response = requests.get(base_url, params=params, headers=headers)
-        response.raise_for_status()
-        result = response.json()
+        status_code, result = await scheduled_get_json(
+            session, scheduler, base_url, PRIORITY_BACKGROUND, params=params, headers=headers
+        )
+        if status_code != 200:
+            logging.error("Pocket Universe API returned HTTP %s for %s.", status_code, coin.get('name', 'Unknown'))
+            return False
 
         # Assume the API returns a field 'is_volume_fake' as True/False
         is_fake = result.get('is_volume_fake', False)
         if is_fake:
-            logging.info(f"Coin {coin.get('name')} ({coin.get('id')}) has fake volume according to Pocket Universe API. Skipping.")
+            logging.info("Coin %s (%s) has fake volume according to Pocket Universe API. Skipping.", coin.get('name'), coin.get('id'))
             return False
         return True
-    except requests.RequestException as e:
-        logging.error(f"Error connecting to Pocket Universe API for {coin.get('name', 'Unknown')}: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError, RateLimitedError) as e:
+        logging.error("Error connecting to Pocket Universe API for %s: %s", coin.get('name', 'Unknown'), e)
         return False
     except Exception as e:
-        logging.error(f"Unexpected error during Pocket Universe API validation for {coin.get('name', 'Unknown')}: {e}")
+        logging.error("Unexpected error during Pocket Universe API validation for %s: %s", coin.get('name', 'Unknown'), e)
         return False
 
-def is_volume_valid(coin, config):
+def volume_method(config):
     """
-    Determines if a coin's volume is valid based on the selected method.
+    Returns the configured fake-volume detection method.
     """
     method = config['fake_volume_detection']['method'].lower()
-    if method == 'algorithm':
-        return is_volume_valid_algorithm(coin, config)
-    elif method == 'pocket_universe':
-        return is_volume_valid_pocket_universe(coin, config)
-    else:
-        logging.warning(f"Unknown fake_volume_detection method '{method}'. Defaulting to algorithm-based validation.")
-        return is_volume_valid_algorithm(coin, config)
+    if method not in ('algorithm', 'pocket_universe'):
+        logging.warning("Unknown fake_volume_detection method '%s'. Defaulting to algorithm-based validation.", method)
+        return 'algorithm'
+    return method
 
 def is_token_selected_for_trade(coin, config):
     """
@@ -219,18 +338,15 @@ def is_token_selected_for_trade(coin, config):
 
 def send_telegram_message(message, config):
     """
-    Sends a message to the configured Telegram chat.
+    Queues a message for the configured Telegram chat; it goes out in the next digest.
     """
-    try:
-        chat_id = config['telegram']['chat_id']
-        telegram_bot.send_message(chat_id=chat_id, text=message)
-        logging.info(f"Sent Telegram message: {message}")
-    except TelegramError as e:
-        logging.error(f"Error sending Telegram message: {e}")
+    notifier.notify(config['telegram']['chat_id'], message)
+    logging.info("Queued Telegram message: %s", message)
 
 def trade_via_bonkbot(coin, config, action="buy", amount=1):
     """
-    Sends trade commands to BonkBot via Telegram.
+    Sends trade commands to BonkBot via Telegram, ahead of any queued notifications.
+    Returns a future that resolves to True once BonkBot's chat has the command.
     """
     try:
         bonkbot_chat_id = config['bonkbot']['telegram_chat_id']
@@ -239,177 +355,495 @@ def trade_via_bonkbot(coin, config, action="buy", amount=1):
         elif action.lower() == "sell":
             command = config['bonkbot']['trade_commands']['sell_command'].format(token_id=coin['id'], amount=amount)
         else:
-            logging.error(f"Invalid trade action: {action}")
-            return
+            logging.error("Invalid trade action: %s", action)
+            return None
 
         # Send the command to BonkBot's Telegram chat
-        telegram_bot.send_message(chat_id=bonkbot_chat_id, text=command)
-        logging.info(f"Sent trade command to BonkBot: {command}")
+        delivered = notifier.send_priority(bonkbot_chat_id, command)
+        logging.info("Queued trade command for BonkBot: %s", command)
+        return delivered
 
-        # Notify via Telegram about the trade
-        notification = f"Executed {action.upper()} for {coin['name']} ({coin['id']}) with amount {amount}."
-        send_telegram_message(notification, config)
-
-    except TelegramError as e:
-        logging.error(f"Error sending trade command to BonkBot: {e}")
     except Exception as e:
-        logging.error(f"Unexpected error during trade via BonkBot: {e}")
-
-def parse_coin_data(raw_data, config):
-    coins = []
-    coin_blacklist = set(config.get('coin_blacklist', []))
-    dev_blacklist = set(config.get('dev_blacklist', []))
-    filters = config.get('filters', {})
-    min_change = filters.get('min_price_change_percentage_24h', 0)
-    max_change = filters.get('max_price_change_percentage_24h', 0)
-    monitored_events = set(filters.get('monitored_events', []))
+        logging.error("Unexpected error during trade via BonkBot: %s", e)
+        return None
 
-    for item in raw_data.get('tokens', []):
-        try:
-            coin_id = item.get('id')
-            coin_name = item.get('name')
-            price = float(item.get('price', 0))
-            price_change = float(item.get('price_change_percentage_24h', 0))
-            dev_address = item.get('developer_address', '')  # Adjust based on actual data field
-
-            # Apply Coin Blacklist
-            if coin_id in coin_blacklist or coin_name in coin_blacklist:
-                logging.info(f"Coin {coin_name} ({coin_id}) is blacklisted. Skipping.")
-                continue
+async def dispatch_trade(order):
+    """
+    Trade-dispatch worker step: returns once BonkBot has the order (True) or it failed.
+    The trade is only reported as executed after BonkBot's chat received the command.
+    """
+    coin = order.coin
+    delivered = trade_via_bonkbot(coin, config, order.action, order.amount)
+    try:
+        sent = await delivered if delivered is not None else False
+    except Exception as e:
+        logging.error("Error sending trade command for %s: %s", coin.get('id'), e)
+        sent = False
+    if sent:
+        notification = f"Executed {order.action.upper()} for {coin['name']} ({coin['id']}) with amount {order.amount} at price {coin['price']} USD."
+    else:
+        notification = f"Failed to send {order.action.upper()} for {coin['name']} ({coin['id']}) to BonkBot."
+    send_telegram_message(notification, config)
+    return sent
 
-            # Apply Dev Blacklist
-            if dev_address in dev_blacklist:
-                logging.info(f"Developer {dev_address} is blacklisted. Skipping coin {coin_name}.")
-                continue
+def numeric_column(frame, column):
+    """
+    Column as floats; missing columns, missing values and junk count as 0.
+    """
+    if column not in frame:
+        return pd.Series(0.0, index=frame.index)
+    return pd.to_numeric(frame[column], errors='coerce').fillna(0.0)
 
-            # Determine Event Type
-            event_type = determine_event_type(price_change, item, config)
+def flag_column(frame, column):
+    if column not in frame:
+        return pd.Series(False, index=frame.index)
+    return frame[column].fillna(False).astype(bool)
 
-            # Apply Monitored Events Filter
-            if event_type not in monitored_events:
-                continue
+def text_column(frame, column, default=''):
+    if column not in frame:
+        return pd.Series(default, index=frame.index, dtype=object)
+    return frame[column].fillna(default)
 
-            # Verify token status on rugcheck.xyz
-            if not is_token_good_rugcheck(coin_id, config):
-                continue
+def prefilter_candidates(items, config, blacklist):
+    """
+    Stage 1: applies every free local check to the whole payload in columnar
+    form (blacklists, event type, bundled supply and, for the algorithm
+    method, the volume thresholds). Returns (item, coin) pairs for the tokens
+    that still need network validation. Bundled tokens are only flagged here:
+    as before, they feed the blacklists once they have passed rugcheck.
+    """
+    if not items:
+        return []
+    frame = pd.DataFrame.from_records(items)
+    filters = config.get('filters', {})
+    monitored_events = list(filters.get('monitored_events', []))
+
+    coin_ids = text_column(frame, 'id', None)
+    coin_names = text_column(frame, 'name', None)
+    dev_addresses = text_column(frame, 'developer_address')  # Adjust based on actual data field
+    # The blacklist holds address keys (EVM lowercased), not the checksummed form DexScreener sends
+    coin_keys = coin_ids.map(address_key, na_action='ignore')
+    dev_keys = dev_addresses.map(address_key)
+    prices = numeric_column(frame, 'price')
+    event_types = classify_events(numeric_column(frame, 'price_change_percentage_24h'), frame, config)
+
+    # Apply Coin and Dev Blacklists
+    coin_blacklist = blacklist.members(KIND_COIN)
+    dev_blacklist = blacklist.members(KIND_DEV)
+    blacklisted = coin_keys.isin(coin_blacklist) | coin_names.isin(coin_blacklist) | dev_keys.isin(dev_blacklist)
+    # Apply Monitored Events Filter
+    keep = ~blacklisted & event_types.isin(monitored_events)
+
+    # Bundled supply is checked after rugcheck, so bundled tokens skip the volume filter
+    bundled = keep & bundled_supply_mask(frame, config)
+
+    # Algorithm-based volume validation is free, so it runs before any API call
+    if volume_method(config) == 'algorithm':
+        keep &= bundled | volume_mask_algorithm(frame, config)
+
+    logging.info(
+        f"Pre-filter: {len(frame)} tokens, {int(blacklisted.sum())} blacklisted, "
+        f"{int(bundled.sum())} bundled, {int(keep.sum())} sent to network validation."
+    )
+    candidates = []
+    for position in np.flatnonzero(keep.to_numpy()):
+        candidates.append((items[position], {
+            'id': coin_ids.iat[position],
+            'name': coin_names.iat[position],
+            'price': float(prices.iat[position]),
+            'event_type': event_types.iat[position],
+            'dev_address': dev_addresses.iat[position],
+            'detected_at': items[position].get('detected_at'),
+            'bundled': bool(bundled.iat[position]),
+        }))
+    return candidates
+
+async def validate_coin(item, coin, config, session, scheduler, semaphore):
+    """
+    Stage 2: network validators, bounded by the shared semaphore.
+    Returns the coin stamped with its detection time, or None if rejected.
+    """
+    async with semaphore:
+        # Verify token status on rugcheck.xyz
+        if not await is_token_good_rugcheck(coin['id'], config, session, scheduler):
+            return None
+
+        # Check for bundled supply; those tokens feed the blacklists instead
+        if coin.pop('bundled'):
+            # SQLite commit; keep it off the event loop the bot shares
+            await asyncio.to_thread(update_blacklists_if_bundled, item, blacklist)
+            return None
+
+        # Validate Volume (the algorithm method already ran in the pre-filter)
+        if volume_method(config) == 'pocket_universe':
+            if not await is_volume_valid_pocket_universe(item, config, session, scheduler):
+                return None
+
+    coin['timestamp'] = datetime.datetime.utcnow()
+    coin['validated_at'] = time.monotonic()
+    return coin
+
+async def parse_coin_data(raw_data, config, session, scheduler):
+    """
+    Runs the local filters, then validates the survivors concurrently.
+    Yields each coin as soon as it passes, instead of after the whole list.
+    """
+    await asyncio.to_thread(blacklist.refresh)
+    semaphore = asyncio.Semaphore(config.get('pipeline', {}).get('max_concurrency', DEFAULT_MAX_CONCURRENCY))
 
-            # Check for bundled supply
-            if is_supply_bundled(item, config):
-                update_blacklists_if_bundled(item, config)
-                logging.info(f"Token {coin_name} ({coin_id}) has bundled supply. Added to blacklists. Skipping.")
-                continue
+    candidates = prefilter_candidates(raw_data.get('tokens', []), config, blacklist)
+    tasks = [
+        asyncio.ensure_future(validate_coin(item, coin, config, session, scheduler, semaphore))
+        for item, coin in candidates
+    ]
 
-            # Validate Volume
-            if not is_volume_valid(item, config):
+    passed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                coin = await next_done
+            except Exception as e:
+                logging.error("Error validating coin: %s", e)
                 continue
+            if coin is not None:
+                passed += 1
+                yield coin
+    finally:
+        # Consumer stopped early: do not leave validators running
+        for task in tasks:
+            task.cancel()
+    logging.info("Parsed %d coins after applying filters, blacklists, rugcheck.xyz verification, supply check, and volume validation.", passed)
 
-            # At this point, the coin is valid and can be considered for trading
-            coin = {
-                'id': coin_id,
-                'name': coin_name,
-                'price': price,
-                'event_type': event_type,
-                'dev_address': dev_address,
-                'timestamp': datetime.datetime.utcnow()
-            }
-
-            # Add to the list of processed coins
-            coins.append(coin)
-
-            # Optionally, select the coin for trading
-            if is_token_selected_for_trade(coin, config):
-                # Execute trade (buy) via BonkBot
-                trade_via_bonkbot(coin, config, action="buy", amount=1)  # Adjust amount as needed
-
-                # Send Telegram notification about the trade
-                trade_message = f"Executed BUY for {coin['name']} ({coin['id']}) at price {price} USD."
-                send_telegram_message(trade_message, config)
-
-        except Exception as e:
-            logging.error(f"Error parsing coin data for {item.get('name', 'Unknown')}: {e}")
-    logging.info(f"Parsed {len(coins)} coins after applying filters, blacklists, rugcheck.xyz verification, supply check, and volume validation.")
-    return coins
-
-def determine_event_type(price_change, item, config):
+async def process_coins(coins, config, batch_size=50):
+    """
+    Stage 3: hand each coin to the trade dispatcher as it arrives, persist them in batches.
+    Saves run in the background so they never hold up the next coin's order.
+    """
+    processed = []
+    batch = []
+    saves = []
+    async for coin in coins:
+        processed.append(coin)
+        batch.append(coin)
+        recent_detections.append(coin)
+
+        # Optionally, select the coin for trading
+        if is_token_selected_for_trade(coin, config):
+            # Queue a buy order for BonkBot; the dispatcher's worker sends it
+            trade_dispatcher.submit(TradeOrder.from_coin(coin, "buy", 1))  # Adjust amount as needed
+
+        if len(batch) >= batch_size:
+            saves.append(asyncio.ensure_future(asyncio.to_thread(save_to_database, batch)))
+            batch = []
+    if batch:
+        saves.append(asyncio.ensure_future(asyncio.to_thread(save_to_database, batch)))
+    await asyncio.gather(*saves)
+    return processed
+
+def classify_events(price_change, frame, config):
+    """
+    Event type per token, evaluated in the same order as the scalar rules:
+    pumped, rugged, tier-1, listed on a CEX, other.
+    """
     filters = config.get('filters', {})
     min_change = filters.get('min_price_change_percentage_24h', 0)
     max_change = filters.get('max_price_change_percentage_24h', 0)
 
     # Example logic based on price change
-    if price_change >= min_change:
-        return 'pumped'
-    elif price_change <= max_change:
-        return 'rugged'
-    elif item.get('is_tier_1', False):
-        return 'tier-1'
-    elif item.get('is_listed_on_cex', False):
-        return 'listed_on_cex'
-    else:
-        return 'other'
+    conditions = [
+        price_change >= min_change,
+        price_change <= max_change,
+        flag_column(frame, 'is_tier_1'),
+        flag_column(frame, 'is_listed_on_cex'),
+    ]
+    choices = ['pumped', 'rugged', 'tier-1', 'listed_on_cex']
+    return pd.Series(np.select(conditions, choices, default='other'), index=frame.index)
 
 def save_to_database(coins):
-    session = Session()
+    """
+    Bulk-inserts coin events; an event already stored for the same
+    (id, timestamp) is left untouched.
+    """
+    if not coins:
+        return
+    rows = [{column: coin.get(column) for column in SAVED_COLUMNS} for coin in coins]
     try:
-        for coin in coins:
-            # Assuming 'id' and 'timestamp' uniquely identify an event
-            existing = session.query(CoinEvent).filter_by(id=coin['id'], timestamp=coin['timestamp']).first()
-            if not existing:
-                new_event = CoinEvent(**coin)
-                session.add(new_event)
-        session.commit()
-        logging.info("Saved coins to database.")
+        with engine.begin() as conn:
+            for start in range(0, len(rows), SAVE_CHUNK_ROWS):
+                statement = sqlite_insert(CoinEvent.__table__).values(rows[start:start + SAVE_CHUNK_ROWS])
+                conn.execute(statement.on_conflict_do_nothing(index_elements=['id', 'timestamp']))
+        logging.info("Saved %d coins to database.", len(rows))
     except Exception as e:
-        session.rollback()
-        logging.error(f"Error saving to database: {e}")
-    finally:
-        session.close()
+        logging.error("Error saving to database: %s", e)
+
+def update_summaries(conn):
+    """
+    Folds coin_events rows above the watermark into the summary tables and
+    advances the watermark, all in the caller's transaction. Returns the
+    number of new events.
+    """
+    low = conn.execute(text("SELECT watermark FROM analytics_state WHERE name = :name"), {'name': ANALYTICS_WATERMARK}).scalar() or 0
+    high = conn.execute(text("SELECT COALESCE(MAX(rowid), 0) FROM coin_events")).scalar()
+    if high <= low:
+        return 0
+    window = {'low': low, 'high': high}
+    new_events = conn.execute(text("SELECT COUNT(*) FROM coin_events WHERE rowid > :low AND rowid <= :high"), window).scalar()
+    conn.execute(text("""
+        INSERT INTO event_type_summary (event_type, event_count, price_count, price_sum, price_sq_sum, price_min, price_max)
+        SELECT COALESCE(event_type, 'unknown'), COUNT(*), COUNT(price), COALESCE(SUM(price), 0), COALESCE(SUM(price * price), 0), MIN(price), MAX(price)
+        FROM coin_events WHERE rowid > :low AND rowid <= :high
+        GROUP BY COALESCE(event_type, 'unknown')
+        ON CONFLICT(event_type) DO UPDATE SET
+            event_count = event_count + excluded.event_count,
+            price_count = price_count + excluded.price_count,
+            price_sum = price_sum + excluded.price_sum,
+            price_sq_sum = price_sq_sum + excluded.price_sq_sum,
+            price_min = MIN(COALESCE(price_min, excluded.price_min), COALESCE(excluded.price_min, price_min)),
+            price_max = MAX(COALESCE(price_max, excluded.price_max), COALESCE(excluded.price_max, price_max))
+    """), window)
+    conn.execute(text("""
+        INSERT INTO event_period_summary (period_start, event_type, event_count, price_count, price_sum, price_min, price_max)
+        SELECT strftime('%Y-%m-%d %H:00:00', timestamp), COALESCE(event_type, 'unknown'), COUNT(*), COUNT(price), COALESCE(SUM(price), 0), MIN(price), MAX(price)
+        FROM coin_events WHERE rowid > :low AND rowid <= :high
+        GROUP BY 1, 2
+        ON CONFLICT(period_start, event_type) DO UPDATE SET
+            event_count = event_count + excluded.event_count,
+            price_count = price_count + excluded.price_count,
+            price_sum = price_sum + excluded.price_sum,
+            price_min = MIN(COALESCE(price_min, excluded.price_min), COALESCE(excluded.price_min, price_min)),
+            price_max = MAX(COALESCE(price_max, excluded.price_max), COALESCE(excluded.price_max, price_max))
+    """), window)
+    conn.execute(text("""
+        INSERT INTO analytics_state (name, watermark) VALUES (:name, :high)
+        ON CONFLICT(name) DO UPDATE SET watermark = excluded.watermark
+    """), {'name': ANALYTICS_WATERMARK, 'high': high})
+    return new_events
+
+def rebuild_summaries():
+    """
+    Recomputes every summary from scratch, streaming coin_events in columnar
+    chunks instead of hydrating ORM objects.
+    """
+    by_type = []
+    by_period = []
+    high = 0
+    with engine.connect() as conn:
+        query = text("SELECT rowid AS row_id, event_type, price, timestamp FROM coin_events ORDER BY rowid")
+        for chunk in pd.read_sql_query(query, conn, chunksize=ANALYTICS_CHUNK_ROWS):
+            high = int(chunk['row_id'].iloc[-1])
+            chunk['event_type'] = chunk['event_type'].fillna('unknown')
+            chunk['price_sq'] = chunk['price'] ** 2
+            chunk['period_start'] = pd.to_datetime(chunk['timestamp']).dt.strftime('%Y-%m-%d %H:00:00')
+            by_type.append(chunk.groupby('event_type').agg(
+                event_count=('event_type', 'size'), price_count=('price', 'count'), price_sum=('price', 'sum'),
+                price_sq_sum=('price_sq', 'sum'), price_min=('price', 'min'), price_max=('price', 'max'),
+            ))
+            by_period.append(chunk.groupby(['period_start', 'event_type']).agg(
+                event_count=('event_type', 'size'), price_count=('price', 'count'), price_sum=('price', 'sum'),
+                price_min=('price', 'min'), price_max=('price', 'max'),
+            ))
+
+    def combine(parts, keys):
+        if not parts:
+            return pd.DataFrame()
+        merged = pd.concat(parts).groupby(level=keys).agg({
+            column: ('min' if column == 'price_min' else 'max' if column == 'price_max' else 'sum')
+            for column in parts[0].columns
+        }).reset_index()
+        # NaN (no prices in a group) must be stored as NULL
+        return merged.astype(object).where(merged.notna(), None)
+
+    type_rows = combine(by_type, 'event_type')
+    period_rows = combine(by_period, ['period_start', 'event_type'])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM event_type_summary"))
+        conn.execute(text("DELETE FROM event_period_summary"))
+        if len(type_rows):
+            conn.execute(EventTypeSummary.__table__.insert(), type_rows.to_dict('records'))
+        if len(period_rows):
+            conn.execute(EventPeriodSummary.__table__.insert(), period_rows.to_dict('records'))
+        conn.execute(text("""
+            INSERT INTO analytics_state (name, watermark) VALUES (:name, :high)
+            ON CONFLICT(name) DO UPDATE SET watermark = excluded.watermark
+        """), {'name': ANALYTICS_WATERMARK, 'high': high})
+    logging.info("Rebuilt analytics summaries up to coin_events rowid %s.", high)
 
 def analyze_data():
-    session = Session()
+    """
+    Updates the summaries and logs them. Returns {'event_counts', 'price_stats'}
+    as plain dicts, or None when there is nothing to report.
+    """
     try:
-        data = session.query(CoinEvent).all()
-        if not data:
+        with engine.begin() as conn:
+            low = conn.execute(text("SELECT watermark FROM analytics_state WHERE name = :name"), {'name': ANALYTICS_WATERMARK}).scalar() or 0
+            high = conn.execute(text("SELECT COALESCE(MAX(rowid), 0) FROM coin_events")).scalar()
+            # coin_events was rebuilt or truncated underneath us; incremental state is invalid
+            needs_rebuild = high < low
+            if not needs_rebuild:
+                new_events = update_summaries(conn)
+                logging.info("Folded %d new events into analytics summaries.", new_events)
+        if needs_rebuild:
+            rebuild_summaries()
+
+        summary = pd.read_sql_query(text("SELECT * FROM event_type_summary"), engine)
+        if summary.empty:
             logging.info("No data to analyze.")
-            return
-        df = pd.DataFrame([{
-            'id': event.id,
-            'name': event.name,
-            'price': event.price,
-            'event_type': event.event_type,
-            'dev_address': event.dev_address,
-            'timestamp': event.timestamp
-        } for event in data])
+            return None
 
         # Example Analysis: Count events by type
-        event_counts = df['event_type'].value_counts()
-        logging.info(f"Event Counts:\n{event_counts}")
-
-        # Example: Price distribution
-        price_stats = df['price'].describe()
-        logging.info(f"Price Statistics:\n{price_stats}")
+        event_counts = summary.set_index('event_type')['event_count'].sort_values(ascending=False)
+        logging.info("Event Counts:\n%s", event_counts)
+        result = {'event_counts': {key: int(value) for key, value in event_counts.items()}, 'price_stats': None}
+
+        # Example: Price distribution, from the running sums
+        count = summary['price_count'].sum()
+        if count:
+            mean = summary['price_sum'].sum() / count
+            variance = (summary['price_sq_sum'].sum() - count * mean * mean) / (count - 1) if count > 1 else 0.0
+            price_stats = pd.Series({
+                'count': count,
+                'mean': mean,
+                'std': max(variance, 0.0) ** 0.5,
+                'min': summary['price_min'].min(),
+                'max': summary['price_max'].max(),
+            })
+            logging.info("Price Statistics:\n%s", price_stats)
+            result['price_stats'] = {key: float(value) for key, value in price_stats.items()}
 
         # More complex pattern recognition can be implemented here
+        return result
     except Exception as e:
-        logging.error(f"Error during analysis: {e}")
-    finally:
-        session.close()
+        logging.error("Error during analysis: %s", e)
+        return None
+
+def run_analysis(database_url=DATABASE_URL):
+    """
+    Process-pool entry point for analyze_data(): the worker keeps its own
+    engine between calls, so the pandas work never runs on the bot's event loop.
+    """
+    if engine is None or str(engine.url) != database_url:
+        setup_database(database_url)
+    return analyze_data()
 
-def job():
+def token_item_from_pair(pair):
+    """
+    Maps a DexScreener PairSnapshot onto the raw token fields the pipeline filters on.
+    """
+    return {
+        'id': pair.base_address,
+        'name': pair.base_name,
+        'price': pair.price_usd or 0,
+        'price_change_percentage_24h': pair.price_change_h24 or 0,
+        'daily_volume': pair.volume_h24 or 0,
+        'pair_address': pair.pair_address,
+        'url': pair.url,
+    }
+
+async def process_new_profiles(profiles, dex_service, config):
+    """
+    Runs only newly listed tokens through the pipeline: one batched pair
+    lookup for all of them, then the usual filters and validators.
+    """
+    detected_at = time.monotonic()
+    addresses = [profile['tokenAddress'] for profile in profiles]
+    pairs = await dex_service.fetch_pairs(addresses, PRIORITY_BACKGROUND)
+    items = [dict(token_item_from_pair(pair), detected_at=detected_at) for pair in pairs.values() if pair]
+    logging.info("%d new token profiles, %d with trading pairs.", len(profiles), len(items))
+    if items:
+        await process_coins(parse_coin_data({'tokens': items}, config, dex_service.session, dex_service.scheduler), config)
+
+async def run_job(session, scheduler):
+    """
+    One full scan of the DexScreener token list (kept for manual runs).
+    """
     logging.info("Job started.")
-    raw_data = fetch_coin_data()
+    raw_data = await fetch_coin_data(session, scheduler)
     if raw_data:
-        coins = parse_coin_data(raw_data, config)
-        save_to_database(coins)
-        analyze_data()
+        detected_at = time.monotonic()
+        for item in raw_data.get('tokens', []):
+            item['detected_at'] = detected_at
+        await process_coins(parse_coin_data(raw_data, config, session, scheduler), config)
     logging.info("Job finished.")
 
-# Schedule the job every hour
-schedule.every(1).hours.do(job)
+async def run_analytics(interval):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(analyze_data)
+        await asyncio.to_thread(blacklist.purge_expired)
+
+def recent_event_ids(hours, limit):
+    """
+    Token ids recorded in coin_events over the last `hours`, newest first.
+    """
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=hours)
+    query = (
+        select(CoinEvent.id)
+        .where(CoinEvent.timestamp >= since)
+        .group_by(CoinEvent.id)
+        .order_by(func.max(CoinEvent.timestamp).desc())
+        .limit(limit)
+    )
+    with engine.connect() as conn:
+        return conn.execute(query).scalars().all()
+
+def make_watcher(dex_service, config):
+    """
+    Token-profile watcher feeding new tokens through the pipeline via dex_service.
+    Tokens already recorded in coin_events are marked seen before the first
+    poll, so a restarted process does not validate and trade them again.
+    """
+    watcher_config = config.get('watcher', {})
+    # rugcheck.xyz only covers Solana
+    chains = watcher_config.get('chains', ['solana'])
+    seen_capacity = watcher_config.get('seen_capacity', 20000)
+
+    async def load_seen():
+        ids = await asyncio.to_thread(recent_event_ids, watcher_config.get('seen_hours', 24), seen_capacity)
+        # coin_events does not record the chain; seed the ids under every watched chain
+        return [(chain, token_id) for token_id in reversed(ids) for chain in chains]
+
+    return TokenProfileWatcher(
+        lambda: dex_service.fetch_latest_token_profiles(PRIORITY_BACKGROUND),
+        lambda profiles: process_new_profiles(profiles, dex_service, config),
+        min_interval=watcher_config.get('min_interval', 5),
+        max_interval=watcher_config.get('max_interval', 60),
+        seen_capacity=seen_capacity,
+        chains=chains,
+        # Without a chain list the seeded keys could not match; fall back to a baseline first poll
+        load_seen=load_seen if chains else None,
+    )
+
+async def start_outbound():
+    await telegram_bot.initialize()
+    trade_dispatcher.start()
+
+async def close_outbound():
+    await trade_dispatcher.close()
+    # Deliver queued trades and digests before the bot shuts down
+    await notifier.close()
+    await telegram_bot.shutdown()
+
+async def main():
+    setup()
+    await start_outbound()
+    send_telegram_message("Dexscreener Bot has started.", config)
+    dex_service = DexScreenerService()
+    await dex_service.start()
+    watcher = make_watcher(dex_service, config)
+    try:
+        await asyncio.gather(watcher.run(), run_analytics(config.get('watcher', {}).get('analytics_interval', 3600)))
+    finally:
+        await watcher.close()
+        await dex_service.close()
+        await close_outbound()
 
-# Run the scheduler
+# Run the scanner on its own (python -m services.test from the repository root);
+# the Discord bot runs it in-process through services.scanner.ScannerService
 if __name__ == "__main__":
+    logging.basicConfig(
+        filename='dexscreener_bot.log',
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s:%(message)s'
+    )
     logging.info("Dexscreener Bot started.")
-    send_telegram_message("Dexscreener Bot has started.", config)
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    asyncio.run(main())
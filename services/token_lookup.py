@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Optional, Set, Tuple
+from db.database import Database
+from db.timeseries import TimeSeriesStore
+from services.dexscreener import DexScreenerService
+from services.pairs import PairSnapshot
+from services.ratelimit import RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+# Per-source deadlines (seconds) for the upstream fan-out
+DEFAULT_DEADLINES = {
+    'pair': 4.0,
+    'rugcheck': 3.0,
+    # Full rugcheck report, only fetched until the tokens table knows the creator
+    'creator': 5.0,
+}
+
+SOURCE_OK = "ok"
+SOURCE_TIMEOUT = "timed out"
+SOURCE_FAILED = "failed"
+SOURCE_RATE_LIMITED = "rate limited"
+
+# Where a lookup result came from
+ORIGIN_LIVE = "live"
+ORIGIN_FRESH = "cached"
+ORIGIN_STALE = "stale"
+ORIGIN_FALLBACK = "fallback"
+
+async def fetch_with_deadline(coro: Awaitable[Any], timeout: float) -> Tuple[Optional[Any], str]:
+    """Await an upstream call, returning (result, status) instead of raising"""
+    try:
+        return await asyncio.wait_for(coro, timeout), SOURCE_OK
+    except asyncio.TimeoutError:
+        return None, SOURCE_TIMEOUT
+    except RateLimitedError:
+        return None, SOURCE_RATE_LIMITED
+    except Exception as e:
+        logger.warning("upstream lookup failed: %r", e)
+        return None, SOURCE_FAILED
+
+def token_record(address: str, pair_info: PairSnapshot, rugcheck_info: Optional[Dict[str, Any]],
+                 creator: Optional[str] = None) -> Dict[str, Any]:
+    """Flatten upstream responses into the shape stored in the tokens table"""
+    return {
+        'address': address,
+        'url': pair_info.url,
+        'dexId': pair_info.dex_id,
+        'marketCap': pair_info.market_cap,
+        'priceUsd': pair_info.price_usd,
+        'liquidityUsd': pair_info.liquidity_usd,
+        'quoteToken': pair_info.quote_name,
+        'rugcheck_score': rugcheck_info.get('score') if rugcheck_info else None,
+        # Deployer address from the full rugcheck report
+        'creator': creator,
+    }
+
+@dataclass
+class TokenLookupResult:
+    record: Optional[Dict[str, Any]]
+    origin: str
+    statuses: Dict[str, str] = field(default_factory=dict)
+
+class TokenLookupService:
+    """Read-through lookup: tokens table first (L2), upstream APIs second.
+
+    Rows younger than fresh_for are served as-is. Older rows are served
+    immediately while a background refresh updates them. Rows older than
+    max_stale are only used when the upstream lookup fails.
+    """
+
+    def __init__(
+        self,
+        dex_service: DexScreenerService,
+        database: Database,
+        fresh_for: float = 60.0,
+        max_stale: float = 24 * 3600.0,
+        deadlines: Optional[Dict[str, float]] = None,
+        timeseries: Optional[TimeSeriesStore] = None,
+    ):
+        self.dex_service = dex_service
+        self.database = database
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self.timeseries = timeseries
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def lookup(self, address: str) -> TokenLookupResult:
+        row = await self.database.get_token_info(address)
+        if row is not None:
+            age = row['age_seconds']
+            if age <= self.fresh_for:
+                return TokenLookupResult(row, ORIGIN_FRESH)
+            if age <= self.max_stale:
+                self._spawn_refresh(address, row)
+                return TokenLookupResult(row, ORIGIN_STALE)
+
+        record, statuses = await self.fetch_upstream(address, previous=row)
+        if record is not None:
+            self._spawn(self._save(record))
+            return TokenLookupResult(record, ORIGIN_LIVE, statuses)
+        if row is not None and statuses['pair'] != SOURCE_OK:
+            # Upstream is degraded; an old answer beats no answer
+            return TokenLookupResult(row, ORIGIN_FALLBACK, statuses)
+        return TokenLookupResult(None, ORIGIN_LIVE, statuses)
+
+    async def fetch_upstream(self, address: str, previous: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+        """Query every upstream at once, each bounded by its own deadline"""
+        lookups = [
+            fetch_with_deadline(self.dex_service.fetch_pair_info(address), self.deadlines['pair']),
+            fetch_with_deadline(self.dex_service.fetch_rugcheck(address), self.deadlines['rugcheck']),
+        ]
+        creator = previous.get('creator') if previous is not None else None
+        if creator is None:
+            # Once stored, the creator is reused from the tokens table and never fetched again
+            lookups.append(fetch_with_deadline(self.dex_service.fetch_creator(address), self.deadlines['creator']))
+        (pair_info, pair_status), (rugcheck_info, rugcheck_status), *fetched = await asyncio.gather(*lookups)
+        statuses = {'pair': pair_status, 'rugcheck': rugcheck_status}
+        if fetched:
+            creator, statuses['creator'] = fetched[0]
+        if not pair_info:
+            return None, statuses
+        record = token_record(address, pair_info, rugcheck_info, creator)
+        if record['rugcheck_score'] is None and previous is not None:
+            record['rugcheck_score'] = previous.get('rugcheck_score')
+        return record, statuses
+
+    async def close(self):
+        """Wait for pending refreshes and write-backs"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _save(self, record: Dict[str, Any]):
+        # Latest row for /check, plus one history sample per upstream fetch
+        await self.database.save_token_info(record)
+        if self.timeseries is not None:
+            await self.timeseries.record(
+                record['address'], record['priceUsd'], record['marketCap'],
+                record['liquidityUsd'], record['rugcheck_score'],
+            )
+
+    def _spawn_refresh(self, address: str, row: Dict[str, Any]):
+        if address in self._refreshing:
+            return
+        self._refreshing.add(address)
+        self._spawn(self._refresh(address, row))
+
+    async def _refresh(self, address: str, row: Dict[str, Any]):
+        try:
+            record, _ = await self.fetch_upstream(address, previous=row)
+            if record is not None:
+                await self._save(record)
+        finally:
+            self._refreshing.discard(address)
+
+    def _spawn(self, coro: Awaitable[Any]):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("token lookup background task failed: %r", task.exception())
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latency segments tracked per order, in pipeline order:
+# detected -> validated -> enqueued -> picked up by the worker -> delivered
+SEGMENTS = ("validation", "handoff", "queue", "send", "total")
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, math.ceil(q / 100.0 * len(samples)) - 1))
+    return samples[rank]
+
+@dataclass
+class TradeOrder:
+    """A trade plus time.monotonic() stamps for each hop it has taken"""
+    coin: Dict[str, Any]
+    action: str = "buy"
+    amount: float = 1
+    detected_at: Optional[float] = None
+    validated_at: Optional[float] = None
+    enqueued_at: Optional[float] = None
+    dequeued_at: Optional[float] = None
+    sent_at: Optional[float] = None
+
+    @classmethod
+    def from_coin(cls, coin: Dict[str, Any], action: str = "buy", amount: float = 1) -> "TradeOrder":
+        validated_at = coin.get('validated_at') or time.monotonic()
+        return cls(coin, action, amount, coin.get('detected_at') or validated_at, validated_at)
+
+    def segments(self) -> Dict[str, float]:
+        """Seconds spent in each segment; only valid once the order is sent"""
+        return {
+            "validation": self.validated_at - self.detected_at,
+            "handoff": self.enqueued_at - self.validated_at,
+            "queue": self.dequeued_at - self.enqueued_at,
+            "send": self.sent_at - self.dequeued_at,
+            "total": self.sent_at - self.detected_at,
+        }
+
+class LatencyTracker:
+    """Keeps the most recent samples per segment for percentile reporting"""
+
+    def __init__(self, capacity: int = 1000):
+        self._samples: Dict[str, Deque[float]] = {segment: deque(maxlen=capacity) for segment in SEGMENTS}
+        self.count = 0
+
+    def record(self, segments: Dict[str, float]):
+        self.count += 1
+        for segment, seconds in segments.items():
+            self._samples[segment].append(seconds)
+
+    def percentiles(self, qs: Iterable[float] = (50, 99)) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for segment, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[segment] = {f"p{q:g}": percentile(ordered, q) for q in qs}
+        return result
+
+class TradeDispatcher:
+    """Order queue drained by one dedicated worker.
+
+    submit() stamps the order and returns immediately, so the scan pipeline
+    never waits on Telegram. send(order) must return once the order has
+    actually been delivered; detection-to-order latency is recorded then and
+    a p50/p99 summary is logged every report_every orders.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[TradeOrder], Awaitable[bool]],
+        report_every: int = 20,
+        capacity: int = 1000,
+    ):
+        self.send = send
+        self.report_every = report_every
+        self.latency = LatencyTracker(capacity)
+        self._queue: "asyncio.Queue[TradeOrder]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.failed = 0
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, order: TradeOrder):
+        order.enqueued_at = time.monotonic()
+        self.submitted += 1
+        self._queue.put_nowait(order)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'submitted': self.submitted,
+            'sent': self.latency.count,
+            'failed': self.failed,
+            'queued': self._queue.qsize(),
+            'latency': self.latency.percentiles(),
+        }
+
+    def report(self):
+        if not self.latency.count:
+            return
+        parts = [
+            f"{segment} p50={values['p50'] * 1000:.0f}ms p99={values['p99'] * 1000:.0f}ms"
+            for segment, values in self.latency.percentiles().items()
+        ]
+        logger.info("Trade latency (%d orders): %s", self.latency.count, ", ".join(parts))
+
+    async def close(self, timeout: float = 10.0):
+        """Wait (up to timeout) for queued orders to go out, then stop the worker"""
+        if self._worker is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.error("%d trade orders still queued at shutdown", self._queue.qsize())
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self.report()
+
+    async def _run(self):
+        while True:
+            order = await self._queue.get()
+            try:
+                order.dequeued_at = time.monotonic()
+                delivered = await self.send(order)
+                order.sent_at = time.monotonic()
+                if delivered:
+                    self.latency.record(order.segments())
+                    if self.latency.count % self.report_every == 0:
+                        self.report()
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error dispatching trade for %s: %s", order.coin.get('id'), e)
+            finally:
+                self._queue.task_done()
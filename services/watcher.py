@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def profile_key(profile: Dict[str, Any]) -> Tuple[str, str]:
+    return (profile.get('chainId') or '', profile.get('tokenAddress') or '')
+
+class TokenProfileWatcher:
+    """Polls the latest token-profiles feed and reports only unseen tokens.
+
+    The poll interval adapts: it halves (down to min_interval) whenever a
+    poll turns up new tokens and grows by `backoff` (up to max_interval)
+    while the feed is quiet or failing. The seen-set is a bounded LRU so it
+    does not grow forever. It only lives in memory, so load_seen (if given)
+    refills it with already-processed tokens before the first poll; without
+    it the first poll of a fresh process only records a baseline.
+    """
+
+    def __init__(
+        self,
+        fetch_profiles: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]],
+        on_new_tokens: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        min_interval: float = 5.0,
+        max_interval: float = 60.0,
+        backoff: float = 1.5,
+        seen_capacity: int = 20000,
+        chains: Optional[List[str]] = None,
+        load_seen: Optional[Callable[[], Awaitable[Iterable[Tuple[str, str]]]]] = None,
+    ):
+        self.fetch_profiles = fetch_profiles
+        self.on_new_tokens = on_new_tokens
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.seen_capacity = seen_capacity
+        self.chains = set(chains) if chains else None
+        self.load_seen = load_seen
+        self._primed = False
+        self.interval = min_interval
+        self._seen: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._handlers = set()
+        self.polls = 0
+        self.new_tokens = 0
+
+    def remember(self, keys: Iterable[Tuple[str, str]]):
+        """Mark (chainId, tokenAddress) keys as seen without reporting them"""
+        for key in keys:
+            self._seen[key] = None
+            self._seen.move_to_end(key)
+        while len(self._seen) > self.seen_capacity:
+            self._seen.popitem(last=False)
+
+    async def prime(self) -> bool:
+        """Fill the seen-set from load_seen once per watcher; False if there is no loader or it failed"""
+        if self.load_seen is None:
+            return False
+        try:
+            self.remember(await self.load_seen())
+        except Exception as e:
+            logger.error("Error loading seen token profiles: %s", e)
+            return False
+        return True
+
+    def diff(self, profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return profiles not seen before, and remember them"""
+        fresh = []
+        for profile in profiles:
+            key = profile_key(profile)
+            if not key[1] or (self.chains is not None and key[0] not in self.chains):
+                continue
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                continue
+            self._seen[key] = None
+            fresh.append(profile)
+        while len(self._seen) > self.seen_capacity:
+            self._seen.popitem(last=False)
+        return fresh
+
+    async def poll_once(self) -> int:
+        self.polls += 1
+        try:
+            profiles = await self.fetch_profiles()
+        except Exception as e:
+            logger.error("Error polling token profiles: %s", e)
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+            return 0
+        if not self._primed:
+            self._primed = True
+            if not await self.prime():
+                # Nothing tells us what a previous process already traded: take this feed as the baseline
+                self.remember(key for key in map(profile_key, profiles or []) if key[1])
+                return 0
+        fresh = self.diff(profiles or [])
+        if fresh:
+            self.new_tokens += len(fresh)
+            self.interval = max(self.min_interval, self.interval / 2)
+            # Hand off without waiting so slow validation never delays the next poll
+            task = asyncio.create_task(self._handle(fresh))
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return len(fresh)
+
+    async def run(self):
+        while True:
+            await self.poll_once()
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _handle(self, fresh: List[Dict[str, Any]]):
+        try:
+            await self.on_new_tokens(fresh)
+        except Exception as e:
+            logger.error("Error processing %d new tokens: %s", len(fresh), e)